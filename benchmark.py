@@ -0,0 +1,896 @@
+import argparse  # pro spouštění jednotlivých měření
+import contextlib  # pro potlačení výpisů z výpočtu
+import io  # pro potlačení výpisů z výpočtu
+import itertools  # pro všechny kombinace měřených molekul
+import time  # pro měření času
+import numpy as np  # knihovna NumPy
+import eem  # eem.py
+import cache  # cache.py
+import classes  # classes.py
+import mgcm  # mgcm.py
+import ogcm  # ogcm.py
+import solver  # solver.py
+import chargefile  # chargefile.py
+import os  # pro dočasný soubor s náboji
+import subprocess  # pro spuštění main.py v novém procesu
+import sys  # pro spuštění main.py stejným interpretem
+import tempfile  # pro dočasný soubor s náboji
+import tracemalloc  # pro měření paměti molekul
+import warnings  # pro potlačení varování původního postupu OGC
+
+from collections import Counter  # knihovna pro použití funkce Counter()
+
+
+"""POMOCNÉ FUNKCE PRO MĚŘENÍ"""
+
+
+def measure(function, *args, repeat=1):
+    """vrátí nejkratší čas z několika opakování a výsledek posledního volání"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def random_coordinates(count, seed=0):
+    """náhodné souřadnice atomů v krychli, jejíž objem roste s počtem atomů (hustota podobná molekulám)"""
+    generator = np.random.RandomState(seed)
+    return generator.uniform(0.0, 2.0 * count ** (1 / 3), size=(count, 3))
+
+
+"""SESTAVENÍ MATICE EEM"""
+
+
+def eem_matrix_loop(kappa, coordinates, parameters_b):
+    """původní sestavení matice po dvojicích atomů pomocí eem.get_distance"""
+    count = coordinates.shape[0]
+    points = [tuple(point) for point in coordinates.tolist()]
+    distance = np.zeros((count + 1, count + 1))
+    for i in range(count):
+        for j in range(i, count):
+            if i == j:
+                distance[i, j] = parameters_b[i]
+            else:
+                distance[i, j] = distance[j, i] = eem.get_distance(kappa, points[i], points[j])
+    distance[count, :] = 1
+    distance[:, count] = -1
+    distance[count, count] = 0
+    return distance
+
+
+def eem_matrix_vectorized(kappa, coordinates, parameters_b):
+    """sestavení matice jedním vektorovým výpočtem pomocí eem.get_distance_matrix"""
+    count = coordinates.shape[0]
+    distance = np.zeros((count + 1, count + 1))
+    eem.get_distance_matrix(kappa, coordinates, distance[:count, :count])
+    distance[np.arange(count), np.arange(count)] = parameters_b
+    distance[count, :] = 1
+    distance[:, count] = -1
+    distance[count, count] = 0
+    return distance
+
+
+def benchmark_eem_matrix(sizes, repeat):
+    print("Atoms      loop [s]  vectorized [s]   speedup  identical")
+    for count in sizes:
+        coordinates = random_coordinates(count)
+        parameters_b = np.random.RandomState(1).uniform(0.2, 0.7, size=count)
+        loop_time, loop_matrix = measure(eem_matrix_loop, 0.45, coordinates, parameters_b, repeat=repeat)
+        vector_time, vector_matrix = measure(eem_matrix_vectorized, 0.45, coordinates, parameters_b, repeat=repeat)
+        print("{:>5} {:>13.4f} {:>15.4f} {:>9.1f}x  {}".format(count, loop_time, vector_time, loop_time / vector_time,
+                                                              np.array_equal(loop_matrix, vector_matrix)))
+
+
+"""ODSTRANĚNÍ VOLNÝCH ELEKTRONOVÝCH PÁRŮ Z MATIC OGC"""
+
+
+def polyoxygenated_orbitals(count_units):
+    """
+    orbitaly polyethylenglykolu H-(O-CH2-CH2)n-OH, kyslík má 6 orbitalů, uhlík 4 a vodík 1
+    vrací velikost matice, propojené dvojice orbitalů (jako při načítání vazeb) a řádky volných párů kyslíku
+    """
+    elements, bonds = ["H"], []
+    for unit in range(count_units):
+        oxygen = len(elements)
+        elements.extend(["O", "C", "C", "H", "H", "H", "H"])
+        bonds.extend([(oxygen - (3 if unit else 1), oxygen), (oxygen, oxygen + 1), (oxygen + 1, oxygen + 2),
+                      (oxygen + 1, oxygen + 3), (oxygen + 1, oxygen + 4), (oxygen + 2, oxygen + 5),
+                      (oxygen + 2, oxygen + 6)])
+    elements.extend(["O", "H"])
+    bonds.extend([(len(elements) - (5 if count_units else 3), len(elements) - 2),
+                  (len(elements) - 2, len(elements) - 1)])
+    orbitals = {"H": 1, "C": 4, "O": 6}
+    positions = np.cumsum([0] + [orbitals[element] for element in elements])
+    shift, pairs = np.zeros(len(elements), dtype=int), []
+    for first, second in bonds:
+        pairs.append((positions[first] + shift[first], positions[second] + shift[second]))
+        shift[first] += 1
+        shift[second] += 1
+    delete_rows = [positions[atom] + row for atom, element in enumerate(elements) if element == "O" for row in (4, 5)]
+    return int(positions[-1]), pairs, delete_rows
+
+
+def prune_delete(size, pairs, delete_rows):
+    """původní postup, matice v plné velikosti a np.delete pro každý odstraněný řádek"""
+    bond_matrix, count_bond_matrix = np.zeros((size, size)), np.zeros((size, size))
+    vectors = [np.zeros((size, 1)) for _ in range(3)]
+    for first, second in pairs:
+        bond_matrix[first, second] = bond_matrix[second, first] = 1
+    for deleted, row in enumerate(sorted(set(delete_rows))):
+        vectors = [np.delete(vector, row - deleted, 0) for vector in vectors]
+        for columns_or_row in [0, 1]:
+            bond_matrix = np.delete(bond_matrix, row - deleted, columns_or_row)
+            count_bond_matrix = np.delete(count_bond_matrix, row - deleted, columns_or_row)
+    return bond_matrix
+
+
+def prune_mask(size, pairs, delete_rows):
+    """matice v plné velikosti, řádky se odstraní jedním výběrem podle masky"""
+    bond_matrix, count_bond_matrix = np.zeros((size, size)), np.zeros((size, size))
+    vectors = [np.zeros((size, 1)) for _ in range(3)]
+    for first, second in pairs:
+        bond_matrix[first, second] = bond_matrix[second, first] = 1
+    keep = np.ones(size, dtype=bool)
+    keep[sorted(set(delete_rows))] = False
+    vectors = [vector[keep] for vector in vectors]
+    count_bond_matrix = count_bond_matrix[np.ix_(keep, keep)]
+    return bond_matrix[np.ix_(keep, keep)]
+
+
+def prune_direct(size, pairs, delete_rows):
+    """postup v classes.py, výsledné pozice orbitalů se spočítají předem a matice se alokuje už zmenšená"""
+    keep = np.ones(size, dtype=bool)
+    keep[sorted(set(delete_rows))] = False
+    new_index = np.cumsum(keep) - 1
+    vectors = [np.zeros((size, 1))[keep] for _ in range(3)]
+    bond_matrix = np.zeros((vectors[0].shape[0], vectors[0].shape[0]))
+    pairs = np.array(pairs)
+    pairs = new_index[pairs[keep[pairs].all(axis=1)]]
+    bond_matrix[pairs[:, 0], pairs[:, 1]] = 1
+    bond_matrix[pairs[:, 1], pairs[:, 0]] = 1
+    return bond_matrix
+
+
+def benchmark_ogc_prune(units, repeat):
+    print("Units  Orbitals  Deleted   np.delete [s]    mask [s]  direct [s]  identical")
+    for count_units in units:
+        size, pairs, delete_rows = polyoxygenated_orbitals(count_units)
+        times, matrices = [], []
+        for prune in (prune_delete, prune_mask, prune_direct):
+            prune_time, matrix = measure(prune, size, pairs, delete_rows, repeat=repeat)
+            times.append(prune_time)
+            matrices.append(matrix)
+        print("{:>5} {:>9} {:>8} {:>15.4f} {:>11.4f} {:>11.4f}  {}".format(
+            count_units, size, len(delete_rows), *times, all(np.array_equal(matrices[0], matrix)
+                                                             for matrix in matrices[1:])))
+
+
+"""NÁBOJE ATOMŮ OGC Z NÁBOJŮ ORBITALŮ"""
+
+
+def random_orbitals(count_molecules, count_atoms, seed=0):
+    """vstupy ogcm.get_atom_charges pro molekuly z atomů H, C a O (1, 4 a 4 orbitaly po odstranění volných párů)"""
+    generator = np.random.RandomState(seed)
+    molecules = []
+    for _ in range(count_molecules):
+        valences = generator.choice(np.array([1, 4, 4], dtype=np.int8), size=count_atoms)
+        size = int(valences.sum())
+        molecules.append((generator.uniform(-1, 1, size=(size, 1)), generator.uniform(3, 8, size=(size, 1)),
+                          generator.uniform(0.3, 0.8, size=(size, 1)), valences))
+    return molecules
+
+
+def reduction_loop(deviation_away_pt, tb_hardness, covalent_radii, valences):
+    """původní postup z ogcm.py, Dm a náboj každého orbitalu v cyklech"""
+    denominator = 0.0
+    numerator = 0.0
+    for i in range(deviation_away_pt.shape[0]):
+        denominator += deviation_away_pt[i]/tb_hardness[i]
+        numerator += (deviation_away_pt[i]**2)/((tb_hardness[i]**3) * covalent_radii[i])
+    dm = denominator/numerator
+    charges_electrons = np.zeros((deviation_away_pt.shape[0], 1))
+    charge_atoms, shift = Counter(), 0
+    for atom, valence in enumerate(valences.tolist()):
+        for index in range(valence):
+            charges_electrons[index + shift][0] = (deviation_away_pt[index + shift][0]/tb_hardness[
+                index + shift][0])-(((deviation_away_pt[index + shift][0]**2)*dm
+                                     )/((tb_hardness[index + shift][0]**3)*covalent_radii[index + shift]))
+            charge_atoms[atom] += float((deviation_away_pt[index + shift]/tb_hardness[index + shift])-(
+                ((deviation_away_pt[index + shift]**2)*dm)/((tb_hardness[index + shift]**3)*covalent_radii[
+                    index + shift])))
+        shift += valence
+    return np.array([charge_atoms[atom] for atom in range(valences.shape[0])])
+
+
+def all_atom_charges(reduction, molecules):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)  # float() z pole o jednom prvku v původním postupu
+        return [reduction(*molecule) for molecule in molecules]
+
+
+def benchmark_ogc_reduction(molecules, atoms, repeat):
+    """pro srovnání i čas řešení soustav stejné velikosti (np.linalg.solve po molekulách)"""
+    print("Atoms  Orbitals   solve [s]   loop [s]  vectorized [s]  speedup  identical")
+    for count_atoms in atoms:
+        data = random_orbitals(molecules, count_atoms)
+        systems = [(np.eye(deviation.shape[0]) * 4 + 1, deviation) for deviation, hardness, radii, valences in data]
+        solve_time, _ = measure(lambda: [np.linalg.solve(*system) for system in systems], repeat=repeat)
+        loop_time, old = measure(all_atom_charges, reduction_loop, data, repeat=repeat)
+        vectorized_time, new = measure(all_atom_charges, ogcm.get_atom_charges, data, repeat=repeat)
+        print("{:>5} {:>9.0f} {:>11.4f} {:>10.4f} {:>15.4f} {:>7.1f}x  {}".format(
+            count_atoms, np.mean([molecule[0].shape[0] for molecule in data]), solve_time, loop_time,
+            vectorized_time, loop_time / vectorized_time, all(np.array_equal(first, second)
+                                                               for first, second in zip(old, new))))
+
+
+"""VÝPOČET EEM PRO VÍCE SOUBORŮ PARAMETRŮ"""
+
+
+def random_molecule(count, seed=0):
+    """molekula z náhodně rozmístěných atomů uhlíku a vodíku s jednoduchými vazbami"""
+    elements = np.random.RandomState(seed).choice(["C", "H"], size=count)
+    return classes.Molecule("random_{}".format(count), count, classes.get_element_codes(elements.tolist()),
+                            np.arange(1, count + 1, dtype=np.int32), np.ones(count, dtype=np.int8), False, False,
+                            coordinates=random_coordinates(count, seed))
+
+
+def random_parameters(count_sets, seed=0):
+    """náhodné soubory parametrů, každá dvojice souborů sdílí kappa"""
+    generator = np.random.RandomState(seed)
+    return [(0.3 + 0.1 * (index // 2), False, [(element, 1, [tuple(generator.uniform(2.0, 3.0, size=2))])
+                                               for element in ("C", "H")]) for index in range(count_sets)]
+
+
+def benchmark_eem_sweep(sizes, sets, molecules, repeat):
+    print("Atoms  Sets  separate [s]   sweep [s]   speedup  identical")
+    for count in sizes:
+        mset = [random_molecule(count, seed) for seed in range(molecules)]
+        parameters_sets = random_parameters(sets)
+        with contextlib.redirect_stdout(io.StringIO()):  # výpisy z výpočtu se nevypisují
+            separate_time, separate = measure(lambda: [eem.Calculate(mset, parameters).give_result()
+                                                       for parameters in parameters_sets], repeat=repeat)
+            sweep_time, sweep = measure(lambda: eem.Sweep(mset, parameters_sets).give_result(), repeat=repeat)
+        identical = all(np.array_equal(first[3], second[3]) for separate_set, sweep_set in zip(separate, sweep)
+                        for first, second in zip(separate_set, sweep_set))
+        print("{:>5} {:>5} {:>13.4f} {:>11.4f} {:>8.1f}x  {}".format(count, sets, separate_time, sweep_time,
+                                                                    separate_time / sweep_time, identical))
+
+
+"""ZÁPIS NÁBOJŮ DO TEXTOVÉHO SOUBORU"""
+
+
+def random_results(count_molecules, count_atoms, seed=0):
+    """výsledky molekul ve tvaru mgcm.py (název, počet atomů, (prvek, vazba) atomů, náboje)"""
+    generator = np.random.RandomState(seed)
+    elements = [("C", 1), ("H", 1), ("O", 2), ("N", 3)]
+    return [("molecule_{}".format(index), count_atoms,
+             [elements[choice] for choice in generator.randint(0, len(elements), size=count_atoms)],
+             generator.uniform(-1.0, 1.0, size=(count_atoms, 1))) for index in range(count_molecules)]
+
+
+def write_print(filename, results):
+    """původní zápis, jedno volání print pro každý řádek"""
+    with open(filename, "w") as f:
+        for name, count, atoms, charges in results:
+            print("{}\n{}".format(name, int(count)), file=f)
+            for i, (atom, bond) in enumerate(atoms):
+                print("{0:6d}  {1:>2}{2} {3: f}".format(i + 1, atom, bond, float(charges[i, 0])), file=f)
+
+
+def write_blocks(filename, results):
+    """zápis v mgcm.py, blok molekuly jedním formátováním a zápis po FLUSH_CHARS znacích"""
+    f = chargefile.open_output(os.path.abspath(filename))
+    for name, count, atoms, charges in results:
+        charges = np.asarray(charges, dtype=float).ravel().tolist()
+        f.write(chargefile.format_molecule(name, count, [(i + 1, atom, bond, charges[i])
+                                                         for i, (atom, bond) in enumerate(atoms)]))
+    f.close()
+
+
+def benchmark_text_write(molecules, atoms, repeat):
+    print("Molecules  Atoms   print [s]  blocks [s]   speedup  identical")
+    directory = tempfile.mkdtemp()
+    for count_atoms in atoms:
+        results = random_results(molecules, count_atoms)
+        files = [os.path.join(directory, name) for name in ("print.txt", "blocks.txt")]
+        print_time, _ = measure(write_print, files[0], results, repeat=repeat)
+        blocks_time, _ = measure(write_blocks, files[1], results, repeat=repeat)
+        with open(files[0], "rb") as first, open(files[1], "rb") as second:
+            identical = first.read() == second.read()
+        print("{:>9} {:>6} {:>11.4f} {:>11.4f} {:>8.1f}x  {}".format(molecules, count_atoms, print_time, blocks_time,
+                                                                    print_time / blocks_time, identical))
+        for filename in files:
+            os.remove(filename)
+    os.rmdir(directory)
+
+
+"""PAMĚŤ MOLEKUL"""
+
+
+class DictAtom:
+    """původní atom s vlastním __dict__ a souřadnicí jako n-ticí"""
+    def __init__(self, number, element_symbol, bond, coordinate=0.0):
+        self.element_symbol = element_symbol
+        self.coordinate = coordinate
+        self.bond = bond
+        self.number = number
+
+
+class DictMolecule:
+    """původní molekula se seznamem atomů a počty atomů podle prvku a vazby (Counter)"""
+    def __init__(self, name, count_atoms, atoms, elements_count, coordinates):
+        self.name = name
+        self.count_atoms = count_atoms
+        self.atoms = atoms
+        self.elements_count = elements_count
+        self.coordinates = coordinates
+
+
+def molecules_objects(data):
+    molecules = []
+    for name, elements, bonds, coordinates in data:
+        atoms = [DictAtom(number, element, bond, tuple(coordinate)) for number, (element, bond, coordinate)
+                 in enumerate(zip(elements, bonds, coordinates.tolist()), 1)]
+        molecules.append(DictMolecule(name, len(atoms), atoms, Counter(zip(elements, bonds)), coordinates))
+    return molecules
+
+
+def molecules_arrays(data):
+    return [classes.Molecule(name, len(elements), classes.get_element_codes(elements),
+                             np.arange(1, len(elements) + 1, dtype=np.int32), np.array(bonds, dtype=np.int8),
+                             False, False, coordinates=coordinates) for name, elements, bonds, coordinates in data]
+
+
+def traced_memory(function, *args):
+    """paměť (v MB), kterou zabírá výsledek funkce"""
+    tracemalloc.start()
+    result = function(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1e6
+
+
+def benchmark_molecule_memory(molecules, atoms):
+    print("Molecules  Atoms  objects [MB]  arrays [MB]  ratio")
+    generator = np.random.RandomState(0)
+    for count_atoms in atoms:
+        data = [("molecule_{}".format(index), generator.choice(["C", "H", "N", "O"], size=count_atoms).tolist(),
+                 generator.randint(1, 3, size=count_atoms).tolist(), random_coordinates(count_atoms, index))
+                for index in range(molecules)]
+        objects, arrays = traced_memory(molecules_objects, data), traced_memory(molecules_arrays, data)
+        print("{:>9} {:>6} {:>13.1f} {:>12.1f} {:>6.1f}x".format(molecules, count_atoms, objects, arrays,
+                                                                objects / arrays))
+
+
+"""ČTENÍ SOUBORU .sdf"""
+
+
+def write_chains(filename, count_molecules, count_atoms, seed=0):
+    """soubor .sdf (V2000) s řetězci náhodných prvků a náhodnými souřadnicemi"""
+    generator = np.random.RandomState(seed)
+    with open(filename, "w") as f:
+        for index in range(count_molecules):
+            elements = generator.choice(["C", "N", "O", "H"], size=count_atoms).tolist()
+            lines = ["chain_{}".format(index), "  benchmark", "",
+                     "{:3d}{:3d}  0  0  0  0  0  0  0  0999 V2000".format(count_atoms, count_atoms - 1)]
+            for element, coordinate in zip(elements, generator.uniform(-50, 50, size=(count_atoms, 3)).tolist()):
+                lines.append("{:10.4f}{:10.4f}{:10.4f} {:<3} 0  0  0  0  0  0  0  0  0  0  0  0".format(*coordinate,
+                                                                                                     element))
+            lines.extend("{:3d}{:3d}{:3d}  0".format(atom, atom + 1, 1 + atom % 2) for atom in range(1, count_atoms))
+            f.write("\n".join(lines + ["M  END", "$$$$"]) + "\n")
+
+
+def parse_lines(filename):
+    """původní čtení, každý řádek atomu a vazby se čte a převádí zvlášť"""
+    molecules = []
+    with open(filename, "r") as fh:
+        while True:
+            line = fh.readline()
+            if "" == line[0:1]:
+                return molecules
+            name, elements, coordinates, bonds = line.strip(), [], [], []
+            fh.readline()
+            fh.readline()
+            line = fh.readline()
+            count_atoms, count_bonds = int(line[0:3]), int(line[3:6])
+            for i in range(count_atoms):
+                line = fh.readline()
+                elements.append(line[31:33].strip())
+                coordinates.append((float(line[2:10]), float(line[12:20]), float(line[22:30])))
+            for i in range(count_bonds):
+                line = fh.readline()
+                bonds.append((int(line[0:3]), int(line[3:6]), int(line[8:9])))
+            while "$$$$" not in fh.readline():
+                pass
+            molecules.append((name, count_atoms, elements, np.array(coordinates).reshape(-1, 3), bonds))
+
+
+def parse_blocks(filename):
+    """čtení v classes.py, bloky atomů a vazeb najednou (classes.read_structure)"""
+    molecules = []
+    with open(filename, "r") as fh:
+        while True:
+            line = fh.readline()
+            if "" == line[0:1]:
+                return molecules
+            name = line.strip()
+            fh.readline()
+            fh.readline()
+            count_atoms, elements, coordinates, bonds = classes.read_structure(fh, fh.readline(), True)
+            while "$$$$" not in fh.readline():
+                pass
+            molecules.append((name, count_atoms, elements, coordinates, bonds))
+
+
+def write_v3000(filename, molecules):
+    """
+    molekuly z parse_lines ve formátu V3000, řádky atomů i vazeb jsou rozdělené na dva řádky znakem -,
+    u atomů uprostřed souřadnice x a u vazeb mezi čísly (mezera oddělující čísla je na začátku druhého řádku)
+    """
+    with open(filename, "w") as f:
+        for name, count_atoms, elements, coordinates, bonds in molecules:
+            lines = [name, "  benchmark", "", "  0  0  0     0  0            999 V3000", "M  V30 BEGIN CTAB",
+                     "M  V30 COUNTS {} {} 0 0 0".format(count_atoms, len(bonds)), "M  V30 BEGIN ATOM"]
+            for index, (element, (x, y, z)) in enumerate(zip(elements, coordinates.tolist()), 1):
+                text = "{} {} {!r} {!r} {!r} 0".format(index, element, x, y, z)
+                split = text.index(" ", len("{} {} ".format(index, element))) - 1  # uvnitř souřadnice x
+                lines.extend(["M  V30 " + text[:split] + "-", "M  V30 " + text[split:]])
+            lines.extend(["M  V30 END ATOM", "M  V30 BEGIN BOND"])
+            for index, (first, second, bond) in enumerate(bonds, 1):
+                lines.extend(["M  V30 {} {} {}-".format(index, bond, first), "M  V30  {}".format(second)])
+            f.write("\n".join(lines + ["M  V30 END BOND", "M  V30 END CTAB", "M  END", "$$$$"]) + "\n")
+
+
+def same_molecules(old, new):
+    return all(first[:3] == second[:3] and first[4] == second[4] and np.array_equal(first[3], second[3])
+               for first, second in zip(old, new)) and len(old) == len(new)
+
+
+def benchmark_sdf_parse(molecules, atoms, repeat):
+    """identical porovnává čtení po řádcích a po blocích, V3000 čtení stejných molekul z formátu V3000"""
+    print("Atoms    lines [mol/s]  lines [MB/s]  blocks [mol/s]  blocks [MB/s]  identical  V3000")
+    directory = tempfile.mkdtemp()
+    filename, filename_v3000 = os.path.join(directory, "chains.sdf"), os.path.join(directory, "chains_v3000.sdf")
+    for count_atoms in atoms:
+        write_chains(filename, molecules, count_atoms)
+        size = os.path.getsize(filename) / 1e6
+        lines_time, old = measure(parse_lines, filename, repeat=repeat)
+        blocks_time, new = measure(parse_blocks, filename, repeat=repeat)
+        write_v3000(filename_v3000, old)
+        print("{:>5} {:>16.0f} {:>13.1f} {:>15.0f} {:>14.1f}  {!s:<9}  {}".format(
+            count_atoms, molecules / lines_time, size / lines_time, molecules / blocks_time, size / blocks_time,
+            same_molecules(old, new), same_molecules(old, parse_blocks(filename_v3000))))
+    os.remove(filename)
+    os.remove(filename_v3000)
+    os.rmdir(directory)
+
+
+"""SPUŠTĚNÍ ČÁSTÍ PROGRAMU"""
+
+
+"""main.py se spustí v novém procesu a na konci se vypíšou načtené knihovny Matplotlib a SciPy"""
+STARTUP_PROBE = """
+import os, runpy, sys
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    sys.stderr.write("modules: {}\\n".format(" ".join(name for name in ("matplotlib", "scipy") if name in sys.modules)))
+"""
+
+
+def write_ethanes(filename, count_molecules, seed=0):
+    """soubor .sdf s molekulami ethanu s náhodně posunutými atomy"""
+    generator = np.random.RandomState(seed)
+    elements = ["C", "C", "H", "H", "H", "H", "H", "H"]
+    bonds = [(1, 2), (1, 3), (1, 4), (1, 5), (2, 6), (2, 7), (2, 8)]
+    with open(filename, "w") as f:
+        for index in range(count_molecules):
+            lines = ["ethane_{}".format(index), "  benchmark", "",
+                     "{:3d}{:3d}  0  0  0  0  0  0  0  0999 V2000".format(len(elements), len(bonds))]
+            for element, coordinate in zip(elements, generator.uniform(-1.5, 1.5, size=(len(elements), 3)).tolist()):
+                lines.append("{:10.4f}{:10.4f}{:10.4f} {:<3} 0  0".format(*coordinate, element))
+            lines.extend("{:3d}{:3d}  1  0".format(first, second) for first, second in bonds)
+            f.write("\n".join(lines + ["M  END", "$$$$"]) + "\n")
+
+
+def write_parameters(filename, parameters):
+    """soubor .xml s parametry EEM ve stejném tvaru jako params.xml, parameters jako MoleculesSet.parameters"""
+    kappa, _, elements = parameters
+    lines = ['<Parameters Kappa="{:.4f}">'.format(kappa)]
+    for element, bond, values in elements:
+        lines.append('<Element Name="{}">'.format(element))
+        lines.extend('<Bond Type="{}" A="{:.4f}" B="{:.4f}"/>'.format(bond, a, b) for a, b in values)
+        lines.append("</Element>")
+    with open(filename, "w") as f:
+        f.write("\n".join(lines + ["</Parameters>"]) + "\n")
+
+
+def run_main(arguments):
+    """čas běhu main.py s arguments a knihovny, které načetl, při chybě main.py skončí výjimkou s jeho výpisem"""
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    start = time.perf_counter()
+    finished = subprocess.run([sys.executable, "-c", STARTUP_PROBE, main_file] + arguments,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+    if finished.returncode != 0:
+        raise RuntimeError("main.py {} failed:\n{}".format(" ".join(arguments), finished.stderr))
+    modules = [line for line in finished.stderr.splitlines() if line.startswith("modules:")]
+    return elapsed, modules[-1].split()[1:] if modules else ["?"]
+
+
+def benchmark_startup(molecules, repeat):
+    """
+    tabulky prvků se hledají v aktuálním adresáři jako při spuštění main.py
+    výpočty a výpis struktury nesmí načíst knihovnu Matplotlib
+    """
+    directory = tempfile.mkdtemp()
+    sdf = os.path.join(directory, "ethanes.sdf")
+    write_ethanes(sdf, molecules)
+    parameters = os.path.join(directory, "parameters.xml")
+    write_parameters(parameters, CUTOFF_PARAMETERS)
+    outputs = [os.path.join(directory, name) for name in ("mgc.txt", "ogc.txt")]
+    commands = [("calculation --eem", ["calculation", sdf, "--eem", "--parameters", parameters, "--output",
+                                       os.path.join(directory, "eem.txt")]),
+                ("calculation --mgc", ["calculation", sdf, "--mgc", "--output", outputs[0]]),
+                ("calculation --ogc", ["calculation", sdf, "--ogc", "--output", outputs[1]]),
+                ("calculation --mgc --sparse", ["calculation", sdf, "--mgc", "--sparse", "--output", outputs[0]]),
+                ("structure --molecules", ["structure", "--molecules", sdf]),
+                ("graph --statistics", ["graph", "--statistics"] + outputs)]
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"])
+    print("Python without program: {:.4f} s".format(time.perf_counter() - started))
+    print("Command                        time [s]  loaded libraries")
+    for label, arguments in commands:
+        best, modules = float("inf"), []
+        for _ in range(repeat):
+            elapsed, modules = run_main(arguments)
+            best = min(best, elapsed)
+        print("{:<28} {:>10.4f}  {}".format(label, best, " ".join(modules) or "-"))
+        if label.startswith(("calculation", "structure")):
+            assert "matplotlib" not in modules, "{} loaded Matplotlib".format(label)
+    for filename in os.listdir(directory):
+        os.remove(os.path.join(directory, filename))
+    os.rmdir(directory)
+
+
+"""EEM S CUTOFF PRO VELKÉ MOLEKULY"""
+
+
+CUTOFF_PARAMETERS = (0.4500, True, [("C", 1, [(2.6488, 0.4192)]), ("H", 1, [(2.4011, 0.5062)])])  # z params.xml
+
+
+def lattice_molecule(count, spacing=2.0, seed=0):
+    """
+    molekula z atomů uhlíku a vodíku v krychlové mřížce s náhodně posunutými atomy (nejmenší vzdálenost 1.5 Å),
+    v náhodně rozmístěných atomech jsou velmi blízké dvojice a soustava EEM je téměř singulární
+    """
+    generator = np.random.RandomState(seed)
+    side = int(np.ceil(count ** (1 / 3)))
+    grid = np.indices((side, side, side)).reshape(3, -1).T[:count] * spacing
+    elements = generator.choice(["C", "H"], size=count)
+    return classes.Molecule("lattice_{}".format(count), count, classes.get_element_codes(elements.tolist()),
+                            np.arange(1, count + 1, dtype=np.int32), np.ones(count, dtype=np.int8), False, False,
+                            coordinates=grid + generator.uniform(-0.25, 0.25, size=grid.shape))
+
+
+def eem_charges(calculation, molecule, *args):
+    """náboje atomů (bez elektronegativity) jedné molekuly spočítané třídou z eem.py, výpisy se nevypisují"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = calculation([molecule], CUTOFF_PARAMETERS, *args).give_result()
+    return np.asarray(result[0][3]).ravel()[:molecule.count_atoms]
+
+
+def traced_peak(function, *args):
+    """nejvyšší paměť (v MB) během volání funkce"""
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def benchmark_eem_cutoff(atoms, cutoffs, repeat):
+    molecule = lattice_molecule(atoms)
+    dense_time, dense = measure(eem_charges, eem.Calculate, molecule, repeat=repeat)
+    print("Dense EEM for {} atoms: {:.4f} s".format(atoms, dense_time))
+    print("Cutoff  damping      pairs    time [s]  max |dq|      RMSD")
+    for cutoff in cutoffs:
+        for damping in (False, True):
+            pairs = eem.get_cutoff_matrix(CUTOFF_PARAMETERS[0], molecule.coordinates, cutoff, damping).nnz // 2
+            cutoff_time, charges = measure(eem_charges, eem.Cutoff, molecule, cutoff, damping, repeat=repeat)
+            difference = charges - dense
+            print("{:>6} {:>8} {:>10} {:>11.4f} {:>9.2e} {:>9.2e}".format(
+                cutoff, str(damping), pairs, cutoff_time, np.abs(difference).max(),
+                np.sqrt(np.mean(difference ** 2))))
+
+
+def benchmark_eem_scaling(sizes, cutoff, repeat):
+    print("Cutoff {} with damping".format(cutoff))
+    print("Atoms  dense [s]  dense [MB]  cutoff [s]  cutoff [MB]  speedup  max |dq|")
+    for count in sizes:
+        molecule = lattice_molecule(count)
+        dense_time, dense = measure(eem_charges, eem.Calculate, molecule, repeat=repeat)
+        cutoff_time, charges = measure(eem_charges, eem.Cutoff, molecule, cutoff, True, repeat=repeat)
+        dense_memory = traced_peak(eem_charges, eem.Calculate, molecule)
+        cutoff_memory = traced_peak(eem_charges, eem.Cutoff, molecule, cutoff, True)
+        print("{:>5} {:>10.4f} {:>11.1f} {:>11.4f} {:>12.1f} {:>7.1f}x {:>9.2e}".format(
+            count, dense_time, dense_memory, cutoff_time, cutoff_memory, dense_time / cutoff_time,
+            np.abs(charges - dense).max()))
+
+
+"""EEM PRO KONFORMERY"""
+
+
+def lattice_conformers(count_atoms, count_conformers, shift, seed=0):
+    """konformery molekuly z lattice_molecule, atomy jsou náhodně posunuté nejvýše o shift (Å) v každé ose"""
+    generator, molecule = np.random.RandomState(seed), lattice_molecule(count_atoms, seed=seed)
+    return [classes.Molecule(molecule.name, count_atoms, molecule.elements, molecule.numbers, molecule.bonds, False,
+                             False, coordinates=molecule.coordinates + generator.uniform(-shift, shift, size=(
+                                 count_atoms, 3))) for _ in range(count_conformers)]
+
+
+def all_charges(calculation, molecules, *args):
+    """náboje všech molekul spočítané třídou z eem.py, výpisy se nevypisují"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [result[3] for result in calculation(molecules, CUTOFF_PARAMETERS, *args).give_result()]
+
+
+def benchmark_eem_conformers(atoms, conformers, shifts, repeat):
+    print("Atoms  Conformers  shift [Å]  separate [s]  conformers [s]  speedup  max |dq|")
+    for count_atoms in atoms:
+        for shift in shifts:
+            molecules = lattice_conformers(count_atoms, conformers, shift)
+            separate_time, separate = measure(all_charges, eem.Calculate, molecules, repeat=repeat)
+            conformers_time, refined = measure(all_charges, eem.Conformers, molecules, repeat=repeat)
+            difference = max(np.abs(first - second).max() for first, second in zip(separate, refined))
+            print("{:>5} {:>11} {:>10} {:>13.4f} {:>15.4f} {:>7.1f}x {:>9.2e}".format(
+                count_atoms, conformers, shift, separate_time, conformers_time, separate_time / conformers_time,
+                difference))
+
+
+"""CACHE NÁBOJŮ MGC A OGC PODLE STRUKTURY MOLEKULY"""
+
+
+def write_alcohols(filename, count_unique, copies, count_carbons, shuffle=True, seed=0):
+    """
+    soubor .sdf s count_unique náhodně rozvětvenými alkoholy o count_carbons uhlících, každý je v souboru copies
+    krát s náhodnými souřadnicemi (jako konformery), při shuffle mají kopie náhodně přeházené pořadí atomů
+    """
+    generator = np.random.RandomState(seed)
+    structures = []
+    for _ in range(count_unique):
+        elements, bonds, free = ["C"], [], [4]
+        for carbon in range(1, count_carbons):  # uhlíkatý řetězec jako náhodný strom
+            parent = generator.choice([atom for atom in range(carbon) if free[atom] > 1])
+            elements.append("C")
+            free.append(3)
+            free[parent] -= 1
+            bonds.append((parent, carbon))
+        for carbon in range(count_carbons):  # zbylé vazby se doplní skupinami -OH a vodíky
+            for _ in range(free[carbon]):
+                elements.append("O" if generator.uniform() < 0.1 else "H")
+                bonds.append((carbon, len(elements) - 1))
+                if elements[-1] == "O":
+                    elements.append("H")
+                    bonds.append((len(elements) - 2, len(elements) - 1))
+        structures.append((elements, bonds))
+    with open(filename, "w") as f:
+        for copy in range(copies):
+            for index, (elements, bonds) in enumerate(structures):
+                order = generator.permutation(len(elements)) if shuffle else np.arange(len(elements))
+                position = np.argsort(order)
+                lines = ["alcohol_{}_{}".format(index, copy), "  benchmark", "",
+                         "{:3d}{:3d}  0  0  0  0  0  0  0  0999 V2000".format(len(elements), len(bonds))]
+                for atom, coordinate in zip(order.tolist(), generator.uniform(-5, 5, size=(len(elements), 3)).tolist()):
+                    lines.append("{:10.4f}{:10.4f}{:10.4f} {:<3} 0  0".format(*coordinate, elements[atom]))
+                lines.extend("{:3d}{:3d}  1  0".format(position[first] + 1, position[second] + 1)
+                             for first, second in bonds)
+                f.write("\n".join(lines + ["M  END", "$$$$"]) + "\n")
+
+
+def graph_charges(method, filename, dedup):
+    """náboje všech molekul ze souboru spočítané MGC nebo OGC, s dedup s prázdnou cache podle struktury molekuly"""
+    topologies = None
+    if dedup:
+        topologies = cache.TopologyCache(method)
+        topologies.charges.clear()  # měří se bez molekul z předchozích výpočtů
+    mset = classes.MoleculesSet()
+    with contextlib.redirect_stdout(io.StringIO()):
+        molecules = mset.iter_sdf(filename, False, method == "mgc", method == "ogc", True, False, topologies)
+        if method == "mgc":
+            results = mgcm.Calculate(molecules, mset.periodic_table, topologies=topologies).give_result()
+            return [np.asarray(result[3], dtype=float).ravel() for result in results], topologies
+        results = ogcm.Calculate(molecules, topologies=topologies).give_result()
+    return [np.array([result[3][element, index] for index, (element, bond) in enumerate(result[2], 1)])
+            for result in results], topologies
+
+
+def benchmark_topology_cache(molecules, copies, carbons, repeat):
+    """kopie molekul se stejným pořadím atomů se najdou bez výpočtu kanonického tvaru (TopologyCache.identify)"""
+    print("Method  Order     Molecules  Copies  Atoms  separate [s]  dedup [s]  speedup  hits  misses  max |dq|")
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "alcohols.sdf")
+    for count_carbons, shuffle in itertools.product(carbons, (False, True)):
+        write_alcohols(filename, molecules, copies, count_carbons, shuffle)
+        for method in ("mgc", "ogc"):
+            separate_time, (separate, _) = measure(graph_charges, method, filename, False, repeat=repeat)
+            dedup_time, (deduplicated, topologies) = measure(graph_charges, method, filename, True, repeat=repeat)
+            difference = max(np.abs(first - second).max() for first, second in zip(separate, deduplicated))
+            print("{:<6}  {:<8} {:>10} {:>7} {:>6} {:>13.4f} {:>10.4f} {:>7.1f}x {:>5} {:>7} {:>9.2e}".format(
+                method.upper(), "shuffled" if shuffle else "same", molecules * copies, copies, separate[0].shape[0],
+                separate_time, dedup_time, separate_time / dedup_time, topologies.hits, topologies.misses,
+                difference))
+    os.remove(filename)
+    os.rmdir(directory)
+
+
+"""ŘEŠIČE SOUSTAV S VYUŽITÍM STRUKTURY MATICE"""
+
+
+def tree_systems(count_molecules, count_atoms, seed=0):
+    """soustavy S = D - A + I (MGC) náhodných stromů s jednoduchými a dvojnými vazbami"""
+    generator = np.random.RandomState(seed)
+    systems = []
+    for _ in range(count_molecules):
+        bond_matrix = np.zeros((count_atoms, count_atoms))
+        for atom in range(1, count_atoms):
+            parent = generator.randint(atom)
+            bond_matrix[atom, parent] = bond_matrix[parent, atom] = generator.choice([1, 2])
+        systems.append((np.diag(bond_matrix.sum(axis=1)) - bond_matrix + np.eye(count_atoms),
+                        generator.uniform(2, 3.5, size=(count_atoms, 1))))
+    return systems
+
+
+def eem_systems(count_molecules, count_atoms):
+    """soustavy EEM molekul z lattice_molecule připravené stejně jako v eem.Calculate"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        calculation = eem.Calculate([], CUTOFF_PARAMETERS)
+    calculation.molecules = [lattice_molecule(count_atoms, seed=seed) for seed in range(count_molecules)]
+    return [(matrix, vector) for data, matrix, vector in calculation.prepare_systems(CUTOFF_PARAMETERS[0], True)]
+
+
+def solve_all(systems, linear_solver):
+    return [solver.solve_one(matrix, vector, linear_solver) for matrix, vector in systems]
+
+
+def benchmark_linear_solvers(sizes, molecules, repeat):
+    """
+    MGC a OGC: rozklad LU a Cholesky, EEM: rozklad LU celé matice a Schurův doplněk
+    geometrický průměr elektronegativit MGC jako odmocnina součinu a přes logaritmy
+    """
+    solver.load_lapack()
+    print("System  Atoms  Molecules    lu [s]  structured [s]  speedup  max |dx|")
+    for size in sizes:
+        for label, systems, linear_solver in (("MGC", tree_systems(molecules, size), "cholesky"),
+                                              ("EEM", eem_systems(molecules, size), "schur")):
+            lu_time, general = measure(solve_all, systems, "lu", repeat=repeat)
+            structured_time, structured = measure(solve_all, systems, linear_solver, repeat=repeat)
+            difference = max(np.abs(first - second).max() for first, second in zip(general, structured))
+            print("{:<6} {:>6} {:>10} {:>9.4f} {:>15.4f} {:>7.1f}x {:>9.2e}".format(
+                label, size, molecules, lu_time, structured_time, lu_time / structured_time, difference))
+    print("Atoms  mean (product)  mean (log space)")
+    generator = np.random.RandomState(0)
+    for size in (100, 1000, 10000):
+        electronegativity = generator.choice([2.55, 2.20, 3.44], size=(size, 1))  # C, H, O
+        multiple = 1
+        with np.errstate(over="ignore"):  # původní postup z mgcm.py, součin přeteče
+            for electroneg in electronegativity:
+                multiple = multiple * electroneg
+            product_mean = float(multiple[0] ** (1 / size))
+        print("{:>5} {:>15.6f} {:>17.6f}".format(size, product_mean,
+                                                 float(np.exp(np.log(electronegativity).sum() / size))))
+
+
+def main():
+    """Definování měření, která lze spustit"""
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command")
+    parser_eem = subparsers.add_parser('eem-matrix', help="Assembly of EEM matrix, loop versus vectorized")
+    parser_eem.add_argument('--sizes', type=int, nargs="+", default=[50, 500, 5000],
+                            help="Give numbers of atoms in measured molecules")
+    parser_eem.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_prune = subparsers.add_parser('ogc-prune', help="Removing lone pair rows from OGC matrices")
+    parser_prune.add_argument('--units', type=int, nargs="+", default=[10, 50, 200],
+                              help="Give numbers of -O-CH2-CH2- units in measured polyethylene glycols")
+    parser_prune.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_reduction = subparsers.add_parser('ogc-reduction', help="Charges of atoms from OGC orbitals, loop versus "
+                                                                   "vectorized")
+    parser_reduction.add_argument('--molecules', type=int, default=1000, help="Give number of molecules")
+    parser_reduction.add_argument('--atoms', type=int, nargs="+", default=[10, 50, 200],
+                                  help="Give numbers of atoms in molecules")
+    parser_reduction.add_argument('--repeat', type=int, default=1,
+                                  help="Give number of repetitions of each measurement")
+    parser_sweep = subparsers.add_parser('eem-sweep', help="EEM for more files with parameters, separate versus sweep")
+    parser_sweep.add_argument('--sizes', type=int, nargs="+", default=[20, 100, 500],
+                              help="Give numbers of atoms in measured molecules")
+    parser_sweep.add_argument('--sets', type=int, default=50, help="Give number of files with parameters")
+    parser_sweep.add_argument('--molecules', type=int, default=10, help="Give number of molecules of each size")
+    parser_sweep.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_write = subparsers.add_parser('text-write', help="Writing charges to text file, print versus blocks")
+    parser_write.add_argument('--molecules', type=int, default=10000, help="Give number of written molecules")
+    parser_write.add_argument('--atoms', type=int, nargs="+", default=[10, 50],
+                              help="Give numbers of atoms in written molecules")
+    parser_write.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_startup = subparsers.add_parser('startup', help="Start of main.py parts and libraries they load")
+    parser_startup.add_argument('--molecules', type=int, default=100, help="Give number of molecules in file")
+    parser_startup.add_argument('--repeat', type=int, default=3, help="Give number of repetitions of each measurement")
+    parser_memory = subparsers.add_parser('molecule-memory', help="Memory of molecules, objects versus arrays")
+    parser_memory.add_argument('--molecules', type=int, default=10000, help="Give number of molecules")
+    parser_memory.add_argument('--atoms', type=int, nargs="+", default=[10, 50],
+                               help="Give numbers of atoms in molecules")
+    parser_parse = subparsers.add_parser('sdf-parse',
+                                         help="Reading atoms and bonds from .sdf, lines versus blocks, V2000 and V3000")
+    parser_parse.add_argument('--molecules', type=int, default=5000, help="Give number of molecules in file")
+    parser_parse.add_argument('--atoms', type=int, nargs="+", default=[10, 50, 200],
+                              help="Give numbers of atoms in molecules")
+    parser_parse.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_cutoff = subparsers.add_parser('eem-cutoff', help="Accuracy of EEM with cutoff versus dense EEM")
+    parser_cutoff.add_argument('--atoms', type=int, default=2000, help="Give number of atoms in molecule")
+    parser_cutoff.add_argument('--cutoffs', type=float, nargs="+", default=[6.0, 10.0, 20.0, 50.0],
+                               help="Give cutoffs (Å)")
+    parser_cutoff.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_scaling = subparsers.add_parser('eem-scaling', help="Time and memory of EEM, dense versus cutoff")
+    parser_scaling.add_argument('--sizes', type=int, nargs="+", default=[1000, 2000, 4000],
+                                help="Give numbers of atoms in measured molecules")
+    parser_scaling.add_argument('--cutoff', type=float, default=10.0, help="Give cutoff (Å)")
+    parser_scaling.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_conformers = subparsers.add_parser('eem-conformers', help="EEM for conformers, separate versus refined")
+    parser_conformers.add_argument('--atoms', type=int, nargs="+", default=[500, 1000, 2000],
+                                   help="Give numbers of atoms in molecules")
+    parser_conformers.add_argument('--conformers', type=int, default=20, help="Give number of conformers")
+    parser_conformers.add_argument('--shifts', type=float, nargs="+", default=[0.05, 0.2],
+                                   help="Give maximum shifts of atoms in conformers (Å)")
+    parser_conformers.add_argument('--repeat', type=int, default=1,
+                                   help="Give number of repetitions of each measurement")
+    parser_topology = subparsers.add_parser('topology-cache', help="MGC and OGC for repeated molecules, separate "
+                                                                   "versus cache of charges by structure")
+    parser_topology.add_argument('--molecules', type=int, default=200, help="Give number of different molecules")
+    parser_topology.add_argument('--copies', type=int, default=10,
+                                 help="Give number of copies of each molecule (with another order of atoms)")
+    parser_topology.add_argument('--carbons', type=int, nargs="+", default=[5, 20],
+                                 help="Give numbers of carbon atoms in molecules")
+    parser_topology.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    parser_solvers = subparsers.add_parser('linear-solvers', help="Solvers of systems, LU versus Cholesky (MGC) and "
+                                                                  "Schur complement (EEM)")
+    parser_solvers.add_argument('--sizes', type=int, nargs="+", default=[10, 100, 1000],
+                                help="Give numbers of atoms in molecules")
+    parser_solvers.add_argument('--molecules', type=int, default=100, help="Give number of molecules of each size")
+    parser_solvers.add_argument('--repeat', type=int, default=1, help="Give number of repetitions of each measurement")
+    args = parser.parse_args()
+    if args.command == "eem-matrix":
+        benchmark_eem_matrix(args.sizes, args.repeat)
+    elif args.command == "ogc-prune":
+        benchmark_ogc_prune(args.units, args.repeat)
+    elif args.command == "ogc-reduction":
+        benchmark_ogc_reduction(args.molecules, args.atoms, args.repeat)
+    elif args.command == "eem-sweep":
+        benchmark_eem_sweep(args.sizes, args.sets, args.molecules, args.repeat)
+    elif args.command == "text-write":
+        benchmark_text_write(args.molecules, args.atoms, args.repeat)
+    elif args.command == "startup":
+        benchmark_startup(args.molecules, args.repeat)
+    elif args.command == "molecule-memory":
+        benchmark_molecule_memory(args.molecules, args.atoms)
+    elif args.command == "sdf-parse":
+        benchmark_sdf_parse(args.molecules, args.atoms, args.repeat)
+    elif args.command == "eem-cutoff":
+        benchmark_eem_cutoff(args.atoms, args.cutoffs, args.repeat)
+    elif args.command == "eem-scaling":
+        benchmark_eem_scaling(args.sizes, args.cutoff, args.repeat)
+    elif args.command == "eem-conformers":
+        benchmark_eem_conformers(args.atoms, args.conformers, args.shifts, args.repeat)
+    elif args.command == "topology-cache":
+        benchmark_topology_cache(args.molecules, args.copies, args.carbons, args.repeat)
+    elif args.command == "linear-solvers":
+        benchmark_linear_solvers(args.sizes, args.molecules, args.repeat)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
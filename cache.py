@@ -0,0 +1,270 @@
+import hashlib  # pro otisk souboru s molekulami
+import os  # pro práci s adresáři cache
+import pickle  # pro uložení textových údajů o molekulách
+import shutil  # pro smazání nedokončené cache
+import sys  # pro ukončení práce při chybném souboru
+import numpy as np  # knihovna NumPy
+import chargefile  # chargefile.py
+import classes  # classes.py
+import solver  # solver.py
+
+from collections import Counter, OrderedDict  # knihovna pro použití funkcí Counter() a OrderedDict()
+
+
+CACHE_DIR = "cache"  # adresář s připravenými molekulami
+CACHE_VERSION = 3  # při změně formátu cache se změní klíč a stará cache se nepoužije
+TOPOLOGY_SIZE = 100000  # nejvyšší počet molekul v cache nábojů podle struktury (TopologyCache)
+CANONICAL_MAX_ATOMS = 200  # větší molekuly se v TopologyCache hledají jen ve stejném pořadí atomů a vazeb
+METHOD_TABLES = {"eem": [], "mgc": [classes.PERIODIC_TABLE], "ogc": [classes.PERIODIC_TABLE,
+                                                                  classes.ELECTRONEGATIVITY_HARDNESS,
+                                                                  classes.COVALENT_RADII]}
+"""
+v cache jsou pro každou molekulu textové údaje v souboru molecules.pkl a čísla v souvislých binárních souborech,
+které se při načtení namapují do paměti (np.memmap), molekula v nich má své místo podle pořadí v souboru
+atoms.bin číslo, prvek a maximální vazba atomů (chargefile.ATOM_DTYPE), valences.bin velikosti valenčních vrstev
+(OGC), coordinates.bin souřadnice atomů a pairs.bin vazby (EEM), entries.bin a values.bin nenulové prvky matice
+sousednosti (MGC, OGC), diagonal.bin diagonála matice stupně (MGC, OGC), vectors.bin tabulkové hodnoty orbitalů (OGC)
+"""
+ARRAYS = {"atoms": (chargefile.ATOM_DTYPE, 1), "valences": (np.int8, 1), "coordinates": (np.float64, 3),
+          "pairs": (np.int32, 3), "entries": (np.int32, 2), "values": (np.float64, 1), "diagonal": (np.float64, 1),
+          "vectors": (np.float64, 3)}
+
+
+"""NAČTENÍ MOLEKUL S POUŽITÍM CACHE"""
+
+
+def iter_cached(mset, filename, method, yes_type=True, use_sparse=False):
+    """
+    vrací generátor molekul pro jednu metodu stejně jako MoleculesSet.iter_sdf
+    pokud pro soubor a metodu už cache existuje, molekuly se nečtou ze souboru .sdf, ale z cache,
+    jinak se molekuly načtou ze souboru a během výpočtu se uloží do cache
+    """
+    if method == "mgc":
+        mset.periodic_table = {}  # doplňuje se průběžně stejně jako při čtení ze souboru
+    path = get_cache_path(filename, method, yes_type)
+    if os.path.isdir(path):
+        return read_cache(mset, filename, path, method, use_sparse)
+    flags = (method == "eem", method == "mgc", method == "ogc", yes_type, use_sparse)
+    return write_cache(path, mset.iter_sdf(filename, *flags), method)
+
+
+def get_cache_path(filename, method, yes_type):
+    """klíč cache je otisk obsahu souboru .sdf, metody, typu vazeb a tabulek, které metoda používá"""
+    key = hashlib.sha256("{} {} {}".format(CACHE_VERSION, method, yes_type).encode())
+    try:
+        with open(filename, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                key.update(block)
+    except IOError:
+        print("Wrong file for molecules set! Try another file than {}".format(filename))
+        sys.exit(1)
+    update_tables(key, method)
+    return os.path.join(CACHE_DIR, key.hexdigest())
+
+
+def update_tables(key, method):
+    """doplní do otisku key obsah tabulek, které metoda používá"""
+    for table in METHOD_TABLES[method]:
+        with open(table.filename, "rb") as fh:
+            key.update(fh.read())
+
+
+"""ULOŽENÍ MOLEKUL DO CACHE"""
+
+
+def write_cache(path, molecules, method):
+    """
+    molekuly se předávají dál hned po načtení a zároveň se připisují na konec souborů v dočasném adresáři,
+    ten se přejmenuje na cache až po načtení celé sady, přerušený výpočet cache nevytvoří
+    """
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    files = {name: open(os.path.join(temporary, name + ".bin"), "wb") for name in ARRAYS}
+    finished = False
+    try:
+        with open(os.path.join(temporary, "molecules.pkl"), "wb") as info:
+            for molecule in molecules:
+                pickle.dump(store_molecule(files, molecule, method), info, pickle.HIGHEST_PROTOCOL)
+                yield molecule
+        finished = True
+    finally:
+        for f in files.values():
+            f.close()
+        if finished:
+            os.replace(temporary, path)
+        else:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+
+def store_molecule(files, molecule, method):
+    """zapíše čísla molekuly do binárních souborů a vrátí její textové údaje a velikosti uložených polí"""
+    atoms = np.zeros(molecule.numbers.shape[0], dtype=chargefile.ATOM_DTYPE)
+    atoms["number"], atoms["bond"] = molecule.numbers, molecule.bonds
+    atoms["element"] = molecule.element_symbols
+    files["atoms"].write(atoms.tobytes())
+    size = nonzero = 0
+    if method == "eem":
+        files["coordinates"].write(np.ascontiguousarray(molecule.coordinates, dtype=np.float64).tobytes())
+        files["pairs"].write(np.ascontiguousarray(molecule.bond_pairs, dtype=np.int32).tobytes())
+        nonzero = molecule.bond_pairs.shape[0]  # u EEM počet vazeb
+    else:
+        bond_matrix = molecule.bond_matrix
+        if solver.is_sparse(bond_matrix):
+            bond_matrix = bond_matrix.toarray()
+        rows, columns = np.nonzero(bond_matrix)
+        size, nonzero = bond_matrix.shape[0], rows.shape[0]
+        files["entries"].write(np.column_stack((rows, columns)).astype(np.int32).tobytes())
+        files["values"].write(bond_matrix[rows, columns].astype(np.float64).tobytes())
+        diagonal = molecule.count_bond_matrix.diagonal()
+        files["diagonal"].write(np.asarray(diagonal, dtype=np.float64).tobytes())
+        if method == "ogc":
+            files["valences"].write(np.asarray(molecule.valences, dtype=np.int8).tobytes())
+            vectors = np.hstack((molecule.tb_el, molecule.tb_hard, molecule.tb_coval_radii))
+            files["vectors"].write(vectors.astype(np.float64).tobytes())
+    elements = sorted(set(molecule.element_symbols)) if method == "mgc" else None
+    return molecule.name, molecule.count_atoms, atoms.shape[0], size, nonzero, elements
+
+
+"""NAČTENÍ MOLEKUL Z CACHE"""
+
+
+def read_cache(mset, filename, path, method, use_sparse):
+    """binární soubory se namapují do paměti, pole molekul jsou jen pohledy do nich"""
+    arrays = {name: map_array(path, name) for name in ARRAYS}
+    if use_sparse:
+        solver.load_sparse()
+    position = Counter()
+    with open(os.path.join(path, "molecules.pkl"), "rb") as info:
+        while True:
+            try:
+                name, count_atoms, count_stored, size, nonzero, elements = pickle.load(info)
+            except EOFError:
+                break
+            atoms = arrays["atoms"][position["atoms"]:position["atoms"] + count_stored, 0]
+            codes = classes.get_element_codes([element.decode() for element in atoms["element"].tolist()])
+            numbers, bonds = atoms["number"], atoms["bond"]
+            if method == "eem":
+                coordinates = arrays["coordinates"][position["atoms"]:position["atoms"] + count_stored]
+                bond_pairs = arrays["pairs"][position["pairs"]:position["pairs"] + nonzero]
+                position["atoms"] += count_stored
+                position["pairs"] += nonzero
+                yield classes.Molecule(name, count_atoms, codes, numbers, bonds, False, False,
+                                       coordinates=coordinates, bond_pairs=bond_pairs)
+                continue
+            entries = arrays["entries"][position["entries"]:position["entries"] + nonzero]
+            values = arrays["values"][position["entries"]:position["entries"] + nonzero, 0]
+            diagonal = arrays["diagonal"][position["diagonal"]:position["diagonal"] + size, 0]
+            position["entries"] += nonzero
+            if use_sparse:
+                bond_matrix = solver.sparse.csr_matrix((values, (entries[:, 0], entries[:, 1])), shape=(size, size))
+                count_bond_matrix = solver.sparse.diags(diagonal, format="csr")
+            else:
+                bond_matrix = np.zeros((size, size))
+                bond_matrix[entries[:, 0], entries[:, 1]] = values
+                count_bond_matrix = np.diag(diagonal)
+            if method == "mgc":
+                mset.periodic_table.update(classes.get_electronegativity_from_periodic_table(
+                    set(elements) - set(mset.periodic_table)))
+                yield classes.Molecule(name, count_atoms, codes, numbers, bonds, count_bond_matrix, bond_matrix)
+            else:
+                vectors = arrays["vectors"][position["diagonal"]:position["diagonal"] + size]
+                valences = arrays["valences"][position["atoms"]:position["atoms"] + count_stored, 0]
+                yield classes.Molecule(name, count_atoms, codes, numbers, bonds, count_bond_matrix, bond_matrix,
+                                       vectors[:, 0:1], vectors[:, 1:2], vectors[:, 2:3], valences=valences)
+            position["diagonal"] += size
+            position["atoms"] += count_stored
+    print("Load molecules from {} (prepared molecules from {})".format(filename, path))
+
+
+def map_array(path, name):
+    """namapování binárního souboru do paměti jako pole o ARRAYS[name][1] sloupcích (obyčejné ndarray, indexování
+    prvků třídy np.memmap je pomalé)"""
+    dtype, columns = ARRAYS[name]
+    filename = os.path.join(path, name + ".bin")
+    if os.path.getsize(filename) == 0:  # prázdný soubor nelze namapovat
+        return np.zeros((0, columns), dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r").view(np.ndarray).reshape(-1, columns)
+
+
+"""CACHE NÁBOJŮ PODLE STRUKTURY MOLEKULY (MGC, OGC)"""
+
+
+class TopologyCache:
+    """
+    náboje MGC a OGC nezávisí na souřadnicích, ale jen na grafu molekuly (prvky a vazby), opakované molekuly
+    (duplikáty, konformery, molekuly s jiným pořadím atomů) se proto podle kanonického tvaru grafu
+    (classes.get_canonical_form) nepočítají znovu
+    náboje se ukládají v kanonickém pořadí atomů, při více než size molekulách se zapomenou nejdéle nepoužité (LRU),
+    kanonický tvar se pamatuje pro otisk molekuly ve stejném pořadí atomů a vazeb a pro stejnou molekulu
+    se tak nepočítá znovu
+    cache se načte ze souboru v adresáři CACHE_DIR a save ji tam uloží, klíč souboru obsahuje tabulky metody
+    """
+    def __init__(self, method, size=TOPOLOGY_SIZE):
+        self.size, self.hits, self.misses, self.forms, self.charges = size, 0, 0, OrderedDict(), OrderedDict()
+        key = hashlib.sha256("{} topology {}".format(CACHE_VERSION, method).encode())
+        update_tables(key, method)
+        self.path = os.path.join(CACHE_DIR, "topology-{}.pkl".format(key.hexdigest()))
+        if os.path.isfile(self.path):
+            with open(self.path, "rb") as f:
+                self.charges = pickle.load(f)
+
+    def identify(self, elements, bonds):
+        """
+        kanonický klíč a pořadí atomů molekuly ze symbolů všech atomů a vazeb (classes.read_structure),
+        molekuly s více než CANONICAL_MAX_ATOMS atomy mají klíčem jen otisk atomů a vazeb v pořadí ze souboru
+        """
+        raw = hashlib.sha256(repr((elements, bonds)).encode()).digest()
+        form = self.forms.get(raw)
+        if form is None:
+            if len(elements) <= CANONICAL_MAX_ATOMS:
+                form = classes.get_canonical_form(elements, bonds)
+            else:
+                form = raw, np.arange(len(elements), dtype=np.int32)
+            self.forms[raw] = form
+            if len(self.forms) > self.size:
+                self.forms.popitem(last=False)
+        else:
+            self.forms.move_to_end(raw)
+        return form
+
+    def __contains__(self, key):
+        """nalezená molekula se posune na konec LRU, do jejího výpočtu ji tak nevytlačí další molekuly z dávky"""
+        if key not in self.charges:
+            return False
+        self.charges.move_to_end(key)
+        return True
+
+    def find(self, molecule):
+        """
+        klíč molekuly pro uložení nábojů (put) a náboje atomů v pořadí molekuly z cache (nebo None),
+        molekula bez kanonického tvaru nebo s atomy bez vazby (ty nemají náboj) má klíč None
+        """
+        if molecule.topology is None or molecule.numbers.shape[0] != molecule.count_atoms:
+            return None, None
+        key, order = molecule.topology
+        canonical = self.charges.get(key)
+        if canonical is None:
+            self.misses += 1
+            return molecule.topology, None
+        self.hits += 1
+        self.charges.move_to_end(key)
+        charges = np.empty_like(canonical)
+        charges[order] = canonical
+        return molecule.topology, charges
+
+    def put(self, topology, charges):
+        """uložení nábojů atomů molekuly (v pořadí molekuly)"""
+        key, order = topology
+        self.charges[key] = np.asarray(charges, dtype=np.float64).ravel()[order]
+        if len(self.charges) > self.size:
+            self.charges.popitem(last=False)
+
+    def save(self):
+        """uložení do souboru a výpis počtu molekul nalezených v cache a spočítaných"""
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(self.charges, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+        print("Topology cache: {} hits, {} misses, {} molecules in {}".format(self.hits, self.misses,
+                                                                           len(self.charges), self.path))
@@ -0,0 +1,140 @@
+import itertools  # pro spojení hodnot atomů do jednoho formátování
+import os  # pro práci s adresářem binárního výstupu
+import numpy as np  # knihovna NumPy
+
+
+"""
+Binární soubor s náboji je adresář se čtyřmi soubory, čísla se zapisují najednou po větších částech:
+charges.bin náboje všech atomů (float64) ve stejném pořadí jako v textovém souboru
+atoms.bin číslo atomu, prvek a maximální vazba každého atomu (ATOM_DTYPE)
+offsets.bin začátky molekul v charges.bin a atoms.bin (int64), poslední hodnota je počet všech atomů
+names.txt názvy molekul, jeden na řádek
+charges.bin, atoms.bin a offsets.bin lze načíst pomocí np.memmap (load_binary)
+"""
+ATOM_DTYPE = np.dtype([("number", np.int32), ("element", "S2"), ("bond", np.int8)])
+FLUSH_ATOMS = 1 << 16  # po kolika atomech se buffer zapíše do souborů
+FLUSH_CHARS = 1 << 20  # po kolika znacích se buffer zapíše do textového souboru
+LINE = "%6d  %2s%s % f\n"  # řádek atomu v textovém souboru, stejný jako "{0:6d}  {1:>2}{2} {3: f}"
+
+
+"""OTEVŘENÍ SOUBORU PRO NÁBOJE"""
+
+
+def open_output(output, binary=False):
+    """
+    output je název souboru v adresáři result, cesta (absolutní cesta může vést mimo result),
+    nebo už otevřený proud (např. sys.stdout), který se na konci nezavře
+    vrací textový soubor (jako dosud) nebo adresář s binárními soubory
+    """
+    if hasattr(output, "write"):
+        return TextWriter(output, getattr(output, "name", str(output)), False)
+    path = os.path.join("result", output)
+    if binary:
+        return BinaryWriter(path)
+    return TextWriter(open(path, "w"), path)
+
+
+"""TEXTOVÝ SOUBOR S NÁBOJI"""
+
+
+def format_molecule(name, count, rows):
+    """
+    blok molekuly v textovém souboru jedním formátováním (jedna šablona LINE pro každý atom),
+    rows jsou čtveřice (číslo atomu, prvek, vazba, náboj), text je stejný jako při výpisu po řádcích pomocí print
+    """
+    return "{}\n{}\n".format(name, int(count)) + (LINE * len(rows)) % tuple(itertools.chain.from_iterable(rows))
+
+
+class TextWriter:
+    """textový soubor s náboji, bloky molekul se sbírají a do souboru se zapisují po FLUSH_CHARS znacích"""
+    def __init__(self, stream, name, owned=True):
+        self.stream, self.name, self.owned, self.pending, self.count_chars = stream, name, owned, [], 0
+
+    def write(self, text):
+        self.pending.append(text)
+        self.count_chars += len(text)
+        if self.count_chars >= FLUSH_CHARS:
+            self.flush()
+
+    def flush(self):
+        self.stream.write("".join(self.pending))
+        self.pending, self.count_chars = [], 0
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class BinaryWriter:
+    """
+    sbírá náboje molekul a zapisuje je do binárních souborů po FLUSH_ATOMS atomech
+    bez path se nic nezapisuje a molekuly zůstávají v pending (paralelní výpočet je předá hlavnímu procesu)
+    """
+    def __init__(self, path=None):
+        self.name, self.pending, self.count_atoms, self.written_atoms, self.files = path, [], 0, 0, {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.files = {name: open(os.path.join(path, name), "wb") for name in ("charges.bin", "atoms.bin",
+                                                                                  "offsets.bin")}
+            self.files["names.txt"] = open(os.path.join(path, "names.txt"), "w")
+            self.files["offsets.bin"].write(np.zeros(1, dtype=np.int64).tobytes())
+
+    def write_molecule(self, name, atoms, charges):
+        """atoms jsou trojice (číslo atomu, prvek, vazba), charges náboje atomů ve stejném pořadí"""
+        records = np.array([(number, element, bond) for number, element, bond in atoms], dtype=ATOM_DTYPE)
+        self.extend([(name, records, np.asarray(charges, dtype=np.float64).ravel()[:len(records)])])
+
+    def extend(self, molecules):
+        """připojí molekuly (název, záznamy atomů, náboje), např. molekuly z pending jiného BinaryWriter"""
+        for molecule in molecules:
+            self.pending.append(molecule)
+            self.count_atoms += molecule[1].shape[0]
+        if self.files and self.count_atoms >= FLUSH_ATOMS:
+            self.flush()
+
+    def flush(self):
+        """zápis molekul z bufferu, každý soubor jedním voláním write"""
+        if not self.files or not self.pending:
+            return
+        names, records, charges = zip(*self.pending)
+        offsets = self.written_atoms + np.cumsum([record.shape[0] for record in records], dtype=np.int64)
+        self.files["charges.bin"].write(np.concatenate(charges).tobytes())
+        self.files["atoms.bin"].write(np.concatenate(records).tobytes())
+        self.files["offsets.bin"].write(offsets.tobytes())
+        self.files["names.txt"].write("".join(name + "\n" for name in names))
+        self.written_atoms, self.pending, self.count_atoms = int(offsets[-1]), [], 0
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+"""NAČTENÍ BINÁRNÍHO SOUBORU S NÁBOJI"""
+
+
+def is_binary(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, "offsets.bin"))
+
+
+def load_binary(path):
+    """
+    vrací názvy molekul, začátky molekul, záznamy atomů a náboje, čísla jsou namapována do paměti
+    názvy jsou generátor, který čte soubor names.txt postupně
+    """
+    names = read_names(os.path.join(path, "names.txt"))
+    offsets = np.memmap(os.path.join(path, "offsets.bin"), dtype=np.int64, mode="r")
+    if offsets[-1] == 0:  # prázdný soubor nelze namapovat
+        return names, offsets, np.zeros(0, dtype=ATOM_DTYPE), np.zeros(0)
+    atoms = np.memmap(os.path.join(path, "atoms.bin"), dtype=ATOM_DTYPE, mode="r")
+    charges = np.memmap(os.path.join(path, "charges.bin"), dtype=np.float64, mode="r")
+    return names, offsets, atoms, charges
+
+
+def read_names(filename):
+    with open(filename, "r") as f:
+        for line in f:
+            yield line.rstrip("\n")
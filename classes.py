@@ -1,14 +1,45 @@
 import sys  # pro ukončení práce při chybném souboru
 import numpy as np  # NumPy knihovna
-import re  # pro pomoc vyhledávání znaku v souboru
+import solver  # solver.py
+import functools  # pro uložení již spočítaných valenčních stavů atomů
+import hashlib  # pro klíč kanonického tvaru molekuly
+import itertools  # pro prefixové součty pozic atomů v matici
 
-from collections import Counter  # knihovna pro použití funkce Counter()
+from collections import Counter, defaultdict  # knihovna pro použití funkcí Counter() a defaultdict()
+
+
+"""
+Kódy prvků: symbol prvku má v ELEMENT_SYMBOLS pořadí, které se používá jako kód v polích molekul (np.uint16),
+symboly se doplňují při prvním výskytu, kódy proto platí jen v rámci jednoho procesu (do cache a do souborů
+s náboji se ukládají symboly)
+"""
+ELEMENT_SYMBOLS = []
+ELEMENT_CODES = {}
+ELEMENT_CODE_DTYPE = np.uint16  # symboly ze souboru nejsou jen prvky periodické tabulky, 256 kódů by nestačilo
+
+
+def get_element_code(symbol):
+    code = ELEMENT_CODES.get(symbol)
+    if code is None:
+        if len(ELEMENT_SYMBOLS) > np.iinfo(ELEMENT_CODE_DTYPE).max:
+            print("Too many different elements, element {} can not be stored.".format(symbol))
+            sys.exit(1)
+        code = ELEMENT_CODES[symbol] = len(ELEMENT_SYMBOLS)
+        ELEMENT_SYMBOLS.append(symbol)
+    return code
+
+
+def get_element_codes(symbols):
+    return np.array([get_element_code(symbol) for symbol in symbols], dtype=ELEMENT_CODE_DTYPE)
 
 
 """TŘÍDA Atom"""
 
 
 class Atom:
+    """jeden atom molekuly, molekula si atomy neukládá a vytváří je jen na požádání (Molecule.atoms)"""
+    __slots__ = ("element_symbol", "coordinate", "bond", "number")
+
     def __init__(self, number, element_symbol, bond, coordinate=0.0):
         self.element_symbol = element_symbol  # symbol prvku
         self.coordinate = coordinate  # souřadnice atomu
@@ -23,19 +54,44 @@ class Atom:
 
 
 class Molecule:
-
-    def __init__(self, name, count_atoms, atoms, elements_count, count_bond_matrix, bond_matrix,
+    """
+    atomy molekuly jsou uložené po sloupcích v polích NumPy (elements, numbers, bonds, coordinates, valences),
+    pole mají stejné pořadí atomů (podle čísla atomu, jen atomy s vazbou)
+    """
+    __slots__ = ("name", "count_atoms", "elements", "numbers", "bonds", "count_bond_matrix", "bond_matrix", "tb_el",
+                 "tb_hard", "tb_coval_radii", "coordinates", "valences", "topology", "bond_pairs")
+
+    def __init__(self, name, count_atoms, elements, numbers, bonds, count_bond_matrix, bond_matrix,
                  tb_el=np.ndarray(shape=(0, 0)), tb_hard=np.ndarray(shape=(0, 0)), tb_coval_radii=np.ndarray(shape=(
-                    0, 0))):
+                    0, 0)), coordinates=np.ndarray(shape=(0, 3)), valences=np.zeros(0, dtype=np.int8), topology=None,
+                 bond_pairs=np.zeros((0, 3), dtype=np.int32)):
         self.name = name  # název molekuly
         self.count_atoms = count_atoms  # počet atomů v molekule
-        self.atoms = atoms  # atomy v molekule, které odkazují na třídu Atom
-        self.elements_count = elements_count  # počet atomů o maximální vazbě (EEM) nebo uložení valenční vrstvy (OGC)
+        self.elements = elements  # kódy prvků atomů (ELEMENT_CODE_DTYPE, ELEMENT_SYMBOLS)
+        self.numbers = numbers  # čísla atomů v souboru .sdf (np.int32)
+        self.bonds = bonds  # maximální vazby atomů (np.int8)
         self.count_bond_matrix = count_bond_matrix  # matice stupně (MGC, OGC)
         self.bond_matrix = bond_matrix  # matice sousednosti (MGC, OGC)
         self.tb_el = tb_el  # vektor tabulkových hodnot Elektronegativity (OGC)
         self.tb_hard = tb_hard  # vektro tabulkových hodnot tvrdosti (OGC)
         self.tb_coval_radii = tb_coval_radii  # vektor tabulkových hodnot kovalentního poloměru (OGC)
+        self.coordinates = coordinates  # matice (N, 3) souřadnic atomů (EEM)
+        self.valences = valences  # velikosti valenčních vrstev atomů (np.int8, OGC)
+        self.topology = topology  # kanonický klíč a pořadí atomů (cache.TopologyCache.identify), jinak None
+        self.bond_pairs = bond_pairs  # vazby (M, 3) jako (číslo prvního atomu, číslo druhého atomu, vazba) (EEM)
+
+    @property
+    def element_symbols(self):
+        return [ELEMENT_SYMBOLS[code] for code in self.elements.tolist()]
+
+    @property
+    def atoms(self):
+        """atomy jako objekty Atom, vytvoří se při každém přístupu"""
+        coordinates = [0.0] * self.numbers.shape[0]
+        if self.coordinates.shape[0]:
+            coordinates = [tuple(coordinate) for coordinate in self.coordinates.tolist()]
+        return [Atom(number, element, bond, coordinate) for number, element, bond, coordinate
+                in zip(self.numbers.tolist(), self.element_symbols, self.bonds.tolist(), coordinates)]
 
     def __str__(self):
         return str("Molecule name: {}\n{}".format(self.name, self.atoms))
@@ -45,78 +101,92 @@ class Molecule:
 
 
 class MoleculesSet:
-    def load_from_sdf(self, filename, eem, mgc, ogc, yes_type=True):
+    def load_from_sdf(self, filename, eem, mgc, ogc, yes_type=True, use_sparse=False, topologies=None):
+        """
+        načtení všech molekul ze souboru najednou do seznamu molecules
+        s topologies mají molekuly kanonický tvar, matice se připraví všem (použije je více metod)
+        """
+        self.molecules = list(self.iter_sdf(filename, eem, mgc, ogc, yes_type, use_sparse, topologies, False))
+
+    def iter_sdf(self, filename, eem, mgc, ogc, yes_type=True, use_sparse=False, topologies=None, skip_known=True):
+        """
+        vrací generátor, který čte molekuly ze souboru postupně, v paměti je vždy jen právě načítaná molekula
+        periodic_table se při MGC doplňuje průběžně o prvky z načtených molekul
+        use_sparse uloží matice MGC a OGC jako řídké matice (CSR) z knihovny SciPy
+        maximální vazby atomů jsou v molekule vždy, yes_type je rozlišuje jen v klíči cache (cache.py)
+        s topologies (cache.TopologyCache) mají molekuly kanonický tvar (topology) a při skip_known se molekuly,
+        jejichž náboje už jsou v topologies, vrátí bez matic MGC a OGC
+        """
+        self.periodic_table = {}
+        return self.read_sdf(filename, eem, mgc, ogc, yes_type, use_sparse, topologies, skip_known)
+
+    def read_sdf(self, filename, eem, mgc, ogc, yes_type, use_sparse, topologies=None, skip_known=True):
         """
-        molecules slouží pro uložení informací o atomech v molekule
-        find_element pro zjistění elektronegativit atomů, které jsou v sadě molekul při výpočetu MGC
+        filename je název souboru nebo už otevřený soubor (např. io.StringIO s částí sady při paralelním výpočtu)
+        find_element pro zjistění elektronegativit atomů, které jsou v molekule při výpočetu MGC
         """
-        molecules, find_elements = [], []
         try:
-            with open(filename, "r") as fh:
+            with (open(filename, "r") if isinstance(filename, str) else filename) as fh:
                 while True:
-                    max_bond, atoms, elements, coordinate, line, elements_count = Counter(), [], [], [], fh.readline(),\
-                                                                                  Counter()
+                    max_bond, line = Counter(), fh.readline()
                     """ 
                     max_bond pro zjištění maximální vazby u atomu
-                    atoms pro uložení třídy Atom pro jednotlivé molekuly
-                    elemnts pro uložení jednotlivých prvků
-                    coordinate pro uložení 3D souřadnic při počítání s EEM
-                    elements_count pro získání počtu atomů s jednotlivýma vazbama v molekule
                     shift pro počítání posunu na další elektron, který ještě není ve vazbě, u jednotlivých atomů
                     delete_rows pro zjištění, který řádky a sloupce s ebudou odstraňovat z matic
                     valence_state pro uložení valenčního stavu atomu
                     atom_info pro uložení všech vazeb jednotlivých atomů
                     """
                     shift, delete_rows, valence_state = Counter(), [], {}
-                    atom_info = {}
-                    if "" == line[0:1]:  # Na konci souboru, se uloží molekuly do třídy molecules
-                        self.molecules = molecules
-                        if mgc:
-                            """Při mětodě MGC se zjistí elektronegativita pro všechny atomy, které jsou v molekulách"""
-                            self.periodic_table = get_electronegativity_from_periodic_table(set(find_elements))
-                        return print("Load molecules from {}".format(filename))
+                    atom_info, orbital_pairs = {}, []
+                    if "" == line[0:1]:  # Na konci souboru
+                        print("Load molecules from {}".format(filename))
+                        return
                     name = (line[:].strip())
                     for i in range(2):  # Nepotřebné řádky
                         fh.readline()
-                    line = fh.readline()
-                    count_atoms, count_bonds = int(line[0:3]), int(line[3:6])  # Počet atomů a vazeb v molekule
-                    for i in range(1, count_atoms + 1):  # Načtení atomů, souřadnic při EEM
-                        line = fh.readline()
-                        elements.append(line[31:33].strip())
-                        if eem:
-                            coordinate.append((float(line[2:10]), float(line[12:20]), float(line[22:30])))
-                        if mgc:
-                            find_elements.append(line[31:33].strip())
-                        if ogc:
-                            atom_info[i] = []  # Potřeba pro uložení všech vazeb jednotlivých atomů
-                    if ogc:  # Příprava matic při výpočetu OGC
+                    """
+                    elements pro uložení jednotlivých prvků
+                    coordinate pro uložení 3D souřadnic (N, 3) při počítání s EEM
+                    bonds jsou vazby mezi atomy (číslo prvního atomu, číslo druhého atomu, vazba)
+                    """
+                    count_atoms, elements, coordinate, bonds = read_structure(fh, fh.readline(), eem)
+                    topology, known, count_bond_matrix, bond_matrix = None, False, None, None
+                    if topologies is not None and (mgc or ogc) and not eem:
+                        """
+                        kanonický tvar molekuly, pro molekulu s náboji v cache se matice nepřipravují
+                        (s EEM se matice MGC a OGC nepřipravují vůbec a náboje se do cache neukládají)
+                        """
+                        topology = topologies.identify(elements, bonds)
+                        known = skip_known and topology[0] in topologies
+                    build_mgc, build_ogc = mgc and not known, ogc and not known
+                    if build_ogc:  # Potřeba pro uložení všech vazeb jednotlivých atomů
+                        atom_info = {i: [] for i in range(1, count_atoms + 1)}
+                    if build_ogc:  # Příprava matic při výpočetu OGC
                         """
                         size_matrix je maximální velikost matice
                         orbital_electrons je součet valenčních elektronů jednotlivých atomu
-                        count_bond_matrix je matice stupně
-                        bond_matrix je matice sousednosti
+                        orbital_positions jsou začáteční pozice atomů v matici, spočítají se jednou pro celou molekulu
+                        orbital_pairs pro uložení propojených orbitalů, matice se alokují až po odstranění volných párů
                         table_elektronegativity je vektor pro tabulkové hodnoty elektronegativity
                         table_hardness je vektor pro tabulkové hodnoty tvrdosti
                         matrix_covalent_radii je vektor pro tabulkové hodnoty kovalentního poloměru
                         """
                         size_matrix, orbital_electrons = get_orbital_electrons(elements)
-                        count_bond_matrix = np.zeros((size_matrix, size_matrix))
-                        bond_matrix = np.zeros((size_matrix, size_matrix))
+                        orbital_positions = get_orbital_positions(orbital_electrons, count_atoms)
+                        count_bond_matrix = bond_matrix = None
                         table_electronegativity = np.zeros((size_matrix, 1))
                         table_hardness = np.zeros((size_matrix, 1))
                         matrix_covalent_radii = np.zeros((size_matrix, 1))
-                    if mgc:  # Příprava matic při výpočetu OGC
-                        count_bond_matrix = np.zeros((count_atoms, count_atoms))
-                        bond_matrix = np.zeros((count_atoms, count_atoms))
-                    for i in range(count_bonds):  # Načtení vazeb mezi atomy
+                    if build_mgc:  # Příprava matic při výpočetu OGC
+                        count_bond_matrix = solver.new_matrix(count_atoms, use_sparse)
+                        bond_matrix = solver.new_matrix(count_atoms, use_sparse)
+                    for first_atom, second_atom, bond in bonds:  # Zpracování vazeb mezi atomy
                         """
                         first_atom a second_atom je číslo atomů, mezi kterými je vazba
                         """
-                        line = fh.readline()
-                        first_atom, second_atom, bond = int(line[0:3]), int(line[3:6]), int(line[8:9])
                         max_bond[first_atom] = max(max_bond[first_atom], bond)
                         max_bond[second_atom] = max(max_bond[second_atom], bond)
-                        if mgc:
+                        if build_mgc:
                             """
                             index1 a index2 je vyjádření čísla atomu v maticové souřadnici
                             """
@@ -124,7 +194,7 @@ class MoleculesSet:
                             bond_matrix[index1, index2] = bond_matrix[index2, index1] = bond
                             count_bond_matrix[index1, index1] += bond
                             count_bond_matrix[index2, index2] += bond
-                        if ogc:
+                        if build_ogc:
                             """
                             info_first a info_second s atom_info ukládají vazby jednolivých atomů podle pořadí
                              jak po sobě následují
@@ -134,29 +204,23 @@ class MoleculesSet:
                             info_second.append(bond)
                             atom_info[first_atom] = info_first
                             atom_info[second_atom] = info_second
-                            orbital_electrons[0] = 0
-                            position1 = position2 = 0
-                            """
-                            zjištění začátečních pozic atomů v matici
-                            """
-                            for valence in range(0, first_atom):
-                                position1 += orbital_electrons[valence]
-                            for valence in range(0, second_atom):
-                                position2 += orbital_electrons[valence]
                             try:
+                                position1, position2 = orbital_positions[first_atom], orbital_positions[second_atom]
                                 for x in range(bond):
                                     """
                                     shift slouží k posunu na další valenční elektron, který ještě není propojen
                                     """
-                                    bond_matrix[position1 + shift[first_atom]][position2 + shift[second_atom]] = \
-                                        bond_matrix[position2 + shift[second_atom]][position1 + shift[first_atom]] = 1
+                                    orbital1, orbital2 = position1 + shift[first_atom], position2 + shift[second_atom]
+                                    if max(orbital1, orbital2) >= size_matrix:
+                                        raise IndexError
+                                    orbital_pairs.append((orbital1, orbital2))
                                     shift[first_atom] += 1
                                     shift[second_atom] += 1
                             except IndexError:
                                 print("Can not prepare data from ", name)
                                 break
                     try:
-                        if ogc:
+                        if build_ogc:
                             """
                             zjištění typu vazby u atomů, příprava tabulkových hodnot, přebytečných řádků
                             a sloupců v matici se provádí funkcí get_valence_state_and_prepare_table_values
@@ -164,19 +228,28 @@ class MoleculesSet:
                             orbital_electrons, max_bond, table_electronegativity, table_hardness,\
                             matrix_covalent_radii, valence_state, \
                             delete_rows = get_valence_state_and_prepare_table_values(atom_info, elements,
-                                                                                     orbital_electrons, max_bond,
+                                                                                     orbital_electrons,
+                                                                                     orbital_positions, max_bond,
                                                                                      table_electronegativity,
                                                                                      table_hardness,
                                                                                      matrix_covalent_radii)
-                            deleted = 0  # posun při vymazání řádku a sloupců
-                            for row in sorted(set(delete_rows)):  # mazání v matici, nejdříve vektory
-                                table_electronegativity = np.delete(table_electronegativity, row - deleted, 0)
-                                table_hardness = np.delete(table_hardness, row - deleted, 0)
-                                matrix_covalent_radii = np.delete(matrix_covalent_radii, row - deleted, 0)
-                                for columns_or_row in [0, 1]:  # mazání rádků a sloupců v matic
-                                    bond_matrix = np.delete(bond_matrix, row - deleted, columns_or_row)
-                                    count_bond_matrix = np.delete(count_bond_matrix, row - deleted, columns_or_row)
-                                deleted += 1
+                            """
+                            řádky s volnými elektronovými páry se z vektorů odstraní jedním výběrem (keep),
+                            matice se rovnou vytvoří ve zmenšené velikosti a orbitaly se do nich zapíšou
+                            na své výsledné pozice (new_index), odstraněné orbitaly se do matic vůbec nezapíšou
+                            """
+                            keep = np.ones(size_matrix, dtype=bool)
+                            keep[sorted(set(delete_rows))] = False
+                            new_index = np.cumsum(keep) - 1
+                            table_electronegativity = table_electronegativity[keep]
+                            table_hardness = table_hardness[keep]
+                            matrix_covalent_radii = matrix_covalent_radii[keep]
+                            bond_matrix = solver.new_matrix(table_electronegativity.shape[0], use_sparse)
+                            if orbital_pairs:
+                                pairs = np.array(orbital_pairs)
+                                pairs = new_index[pairs[keep[pairs].all(axis=1)]]
+                                bond_matrix[pairs[:, 0], pairs[:, 1]] = 1
+                                bond_matrix[pairs[:, 1], pairs[:, 0]] = 1
                             position = 0
                             for valence_electron in orbital_electrons:
                                 """
@@ -193,48 +266,59 @@ class MoleculesSet:
                                         if electron1 != electron2:
                                             bond_matrix[electron1 + position, electron2 + position] = 1
                                 position += orbital_electrons[valence_electron]
-                            for index in range(count_bond_matrix.shape[0]):
-                                """
-                                matice stupně je součet řádku v matici sousednosti 
-                                """
-                                count_bond_matrix[index, index] = int(sum(bond_matrix[index, :]))
+                            """
+                            matice stupně je součet řádku v matici sousednosti 
+                            """
+                            degrees = np.asarray(bond_matrix.sum(axis=1)).ravel().astype(int)
+                            if use_sparse:
+                                count_bond_matrix = solver.sparse.diags(degrees.astype(float), format="csr")
+                            else:
+                                count_bond_matrix = np.diag(degrees.astype(float))
                     except IndexError:
                         print("Can not prepare matrix for ", name)
                         while True:  # pokud je chyba najde se konec molekuly pro další práci v sadě
                             line = fh.readline()
                             if "$$$$" in line:
                                 break
-                    for number in sorted(max_bond):
-                        if eem:
-                            if yes_type:  # součet atomů v molekule podle prvku a maximální vazby
-                                elements_count[(elements[number - 1], max_bond[number])] += 1
-                            else:  # součet atomů v molekule podle prvku
-                                elements_count[elements[number - 1]] += 1
-                            atoms.append(Atom(number, elements[number - 1], max_bond[number], coordinate[number - 1]))
-                        else:
-                            if ogc:
-                                """
-                                elements_count se definuje při počítání ogc pro uložení velikosti valenční vrstvy
-                                """
-                                elements_count[elements[number - 1], number] = len(valence_state[number])
-                            atoms.append(Atom(number, elements[number - 1], max_bond[number]))
+                    """
+                    atomy s vazbou se uloží do polí molekuly v pořadí čísel atomů (kód prvku, číslo, maximální vazba),
+                    při počítání ogc i velikost valenční vrstvy
+                    """
+                    numbers = sorted(max_bond)
+                    atom_codes = get_element_codes([elements[number - 1] for number in numbers])
+                    atom_numbers = np.array(numbers, dtype=np.int32)
+                    atom_bonds = np.array([max_bond[number] for number in numbers], dtype=np.int8)
+                    valences = np.zeros(0, dtype=np.int8)
+                    if build_ogc:
+                        valences = np.array([len(valence_state[number]) for number in numbers], dtype=np.int8)
                     while True:
                         line = fh.readline()
                         if "$$$$" in line:
                             if eem:
                                 count_bond_matrix = bond_matrix = False  # není potřeba
-                            if mgc:
-                                elements_count = False  # není potřeba
-                            if ogc:
-                                molecules.append(Molecule(name, count_atoms, atoms, elements_count, count_bond_matrix,
-                                                          bond_matrix, table_electronegativity, table_hardness,
-                                                          matrix_covalent_radii))
+                            if use_sparse and bond_matrix is not None and (mgc or ogc):  # převod na CSR pro výpočet
+                                count_bond_matrix, bond_matrix = count_bond_matrix.tocsr(), bond_matrix.tocsr()
+                            if build_mgc:
+                                """Při mětodě MGC se zjistí elektronegativita pro nové prvky z molekuly"""
+                                self.periodic_table.update(get_electronegativity_from_periodic_table(
+                                    set(elements) - set(self.periodic_table)))
+                            coordinates, bond_pairs = np.ndarray(shape=(0, 3)), np.zeros((0, 3), dtype=np.int32)
+                            if eem:
+                                """souřadnice se uloží jako jedna matice (N, 3) pro vektorový výpočet vzdáleností"""
+                                coordinates = coordinate[atom_numbers - 1]
+                                bond_pairs = np.array(bonds, dtype=np.int32).reshape(-1, 3)
+                            if build_ogc:
+                                yield Molecule(name, count_atoms, atom_codes, atom_numbers, atom_bonds,
+                                               count_bond_matrix, bond_matrix, table_electronegativity,
+                                               table_hardness, matrix_covalent_radii, coordinates, valences,
+                                               topology, bond_pairs)
                                 """
                                 ogc má vlastní způsob uložení do třídy molecules, jelikož se do ní ukládají více matic 
                                 """
                             else:
-                                molecules.append(Molecule(name, count_atoms, atoms, elements_count, count_bond_matrix,
-                                                          bond_matrix))
+                                yield Molecule(name, count_atoms, atom_codes, atom_numbers, atom_bonds,
+                                               count_bond_matrix, bond_matrix, coordinates=coordinates,
+                                               topology=topology, bond_pairs=bond_pairs)
                             break
         except IOError:
             print("Wrong file for molecules set! Try another file than {}".format(filename))
@@ -278,21 +362,262 @@ class MoleculesSet:
         return str("{}".format(self.molecules))
 
 
+"""ČTENÍ ATOMŮ A VAZEB ZE SOUBORU .sdf"""
+
+
+VECTOR_MIN_LINES = 48  # od kolika řádků vazeb se číslice převádějí najednou pomocí NumPy
+
+
+def read_structure(fh, counts_line, eem):
+    """
+    blok atomů a blok vazeb molekuly (formát V2000 nebo V3000) se načtou najednou a sloupce se převedou
+    pro všechny řádky bloku najednou
+    vrací počet atomů, symboly prvků, souřadnice (N, 3) (jen při eem, jinak None) a vazby jako seznam trojic
+    (číslo prvního atomu, číslo druhého atomu, vazba)
+    """
+    if "V3000" in counts_line:
+        return read_v3000(fh, eem)
+    count_atoms, count_bonds = get_v2000_counts(counts_line)
+    atom_lines = list(itertools.islice(fh, count_atoms))
+    bond_lines = list(itertools.islice(fh, count_bonds))
+    elements, coordinates = [line[31:33].strip() for line in atom_lines], None
+    if eem:  # souřadnice jsou v pevných sloupcích po 10 znacích
+        block = "".join([line[:30] for line in atom_lines]).encode()
+        if len(block) != 30 * count_atoms:  # některý řádek je kratší
+            block = "".join([line[:30].ljust(30) for line in atom_lines]).encode()
+        coordinates = np.frombuffer(block, dtype="S10").astype(float).reshape(-1, 3)
+    return count_atoms, elements, coordinates, get_v2000_bonds(bond_lines)
+
+
+def get_v2000_counts(line):
+    """
+    počet atomů a vazeb jsou ve sloupcích po 3 znacích, zápis větších počtů oddělených mezerami
+    (místo sloupců 6 až 8 nejsou mezery) se čte podle mezer
+    """
+    if line[6:8].strip():
+        count_atoms, count_bonds = line.split()[:2]
+        return int(count_atoms), int(count_bonds)
+    return int(line[0:3]), int(line[3:6])
+
+
+def get_v2000_bonds(lines):
+    """
+    čísla atomů a vazba jsou ve sloupcích po 3 znacích, u bloku s alespoň VECTOR_MIN_LINES řádky se číslice
+    všech řádků převedou najednou z bajtů, u kratšího bloku je to pomalejší než převod po řádcích
+    pokud některý řádek není v pevných sloupcích (např. čísla atomů nad 999 oddělená mezerami), čtou se řádky
+    po jednom (get_v2000_bond)
+    """
+    if len(lines) >= VECTOR_MIN_LINES:
+        block = np.frombuffer("".join([line[:9] for line in lines]).encode(), dtype=np.uint8)
+        if block.shape[0] == 9 * len(lines):
+            columns = block.reshape(-1, 3, 3)
+            blank = columns == ord(" ")
+            if np.all(blank | ((columns >= ord("0")) & (columns <= ord("9")))) and np.all(blank[:, 2, :2]):
+                digits = np.where(blank, 0, columns - ord("0")).astype(np.int64)
+                return [tuple(bond) for bond in (digits @ np.array([100, 10, 1])).tolist()]
+    elif not "".join([line[6:8] for line in lines]).strip():
+        try:
+            return [(int(line[0:3]), int(line[3:6]), int(line[6:9])) for line in lines]
+        except ValueError:
+            pass
+    return [get_v2000_bond(line) for line in lines]
+
+
+def get_v2000_bond(line):
+    if line[6:8].strip():
+        return tuple(int(value) for value in line.split()[:3])
+    return int(line[0:3]), int(line[3:6]), int(line[6:9])
+
+
+def read_v3000(fh, eem):
+    """
+    tabulka CTAB ve formátu V3000, atomy a vazby jsou v řádcích "M  V30" mezi BEGIN ATOM/END ATOM a
+    BEGIN BOND/END BOND, řádek končící znakem - pokračuje na dalším řádku
+    text pokračovacího řádku se připojí beze změny (i s mezerou na začátku, která odděluje čísla) a na čísla
+    se rozdělí až celý spojený řádek
+    """
+    count_atoms, elements, coordinates, bonds, block, pending = 0, [], [], [], None, ""
+    for line in fh:
+        line = pending + line[7:].rstrip() if line.startswith("M  V30") else line.strip()
+        if line.endswith("-"):
+            pending = line[:-1]
+            continue
+        pending, tokens = "", line.split()
+        if not tokens or line.startswith("M  END") or tokens[:2] == ["END", "CTAB"]:
+            break
+        if tokens[0] == "COUNTS":
+            count_atoms = int(tokens[1])
+        elif tokens[0] in ("BEGIN", "END"):
+            block = tokens[1] if tokens[0] == "BEGIN" else None
+        elif block == "ATOM":  # číslo, prvek, x, y, z, ...
+            elements.append(tokens[1])
+            coordinates.append(tokens[2:5])
+        elif block == "BOND":  # číslo, vazba, první atom, druhý atom, ...
+            bonds.append((int(tokens[2]), int(tokens[3]), int(tokens[1])))
+    coordinates = np.array(coordinates, dtype=float).reshape(-1, 3) if eem else None
+    return count_atoms, elements, coordinates, bonds
+
+
+"""KANONICKÝ TVAR MOLEKULOVÉHO GRAFU"""
+
+
+def get_canonical_form(elements, bonds):
+    """
+    kanonický tvar grafu molekuly (prvky atomů a vazby mezi nimi, bez souřadnic), elements jsou symboly všech atomů
+    v pořadí čísel atomů, bonds trojice (číslo prvního atomu, číslo druhého atomu, vazba)
+    atomy se seřadí podle barev (Weisfeilerův-Lehmanův algoritmus, refine_colors), záměnné atomy se rozliší najednou
+    (split_twins) a ostatní atomy se stejnou barvou postupně (první atom nejmenší třídy dostane vlastní barvu
+    a barvy se znovu zpřesní)
+    vrací klíč (otisk prvků a vazeb přečíslovaných podle kanonického pořadí) a order, kde order[k] je index atomu
+    na k-té pozici kanonického pořadí, stejný klíč mají jen stejné grafy
+    """
+    count = len(elements)
+    neighbours = [[] for _ in range(count)]
+    for first, second, bond in bonds:
+        neighbours[first - 1].append((second - 1, bond))
+        neighbours[second - 1].append((first - 1, bond))
+    symbols = sorted(set(elements))
+    colors = split_twins(refine_colors([symbols.index(element) for element in elements], neighbours), neighbours)
+    while len(set(colors)) < count:  # individualizace atomu z nejmenší třídy atomů se stejnou barvou
+        sizes = Counter(colors)
+        atom = colors.index(min(sizes, key=lambda color: (sizes[color] == 1, sizes[color], color)))
+        colors = [2 * color for color in colors]
+        colors[atom] -= 1
+        colors = refine_colors(colors, neighbours)
+    order = sorted(range(count), key=colors.__getitem__)
+    edges = sorted(tuple(sorted((colors[first - 1], colors[second - 1]))) + (bond,) for first, second, bond in bonds)
+    key = hashlib.sha256(repr(([elements[index] for index in order], edges)).encode()).digest()
+    return key, np.array(order, dtype=np.int32)
+
+
+def split_twins(colors, neighbours):
+    """
+    atomy se stejnou barvou a stejnými sousedy se stejnými vazbami (např. vodíky jednoho uhlíku) jsou záměnné,
+    jejich prohození graf nezmění, proto mohou dostat různé barvy v libovolném pořadí bez dalšího zpřesňování
+    """
+    groups = defaultdict(list)
+    for atom, (color, atom_neighbours) in enumerate(zip(colors, neighbours)):
+        groups[color, tuple(sorted(atom_neighbours))].append(atom)
+    twins = [0] * len(colors)
+    for atoms in groups.values():
+        for rank, atom in enumerate(atoms):
+            twins[atom] = rank
+    if not any(twins):
+        return colors
+    ranks = {color: rank for rank, color in enumerate(sorted(set(zip(colors, twins))))}
+    return refine_colors([ranks[color] for color in zip(colors, twins)], neighbours)
+
+
+def refine_colors(colors, neighbours):
+    """
+    barva atomu se nahradí pořadím dvojice (barva, seřazené barvy sousedů s vazbami), dokud přibývají barvy,
+    barvy jsou čísla 0 až počet barev - 1 a nezávisí na pořadí atomů
+    """
+    count_colors = len(set(colors))
+    while True:
+        signatures = [(color, tuple(sorted([(colors[atom], bond) for atom, bond in atom_neighbours])))
+                      for color, atom_neighbours in zip(colors, neighbours)]
+        ranks = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+        colors = [ranks[signature] for signature in signatures]
+        if len(ranks) == count_colors:
+            return colors
+        count_colors = len(ranks)
+
+
+"""TŘÍDA PeriodicTable"""
+
+
+class PeriodicTable:
+    """
+    Periodická tabulka se načte ze souboru jen jednou (při prvním použití) do slovníku.
+    Prvek se v souboru hledal jako ",symbol," na řádku, proto se řádek uloží pod všechny své vnitřní sloupce
+    a platí první řádek, na kterém se symbol vyskytuje.
+    Pro každý řádek se uloží (pořadové číslo, elektronegativita, velikost valenční vrstvy).
+    """
+    def __init__(self, filename):
+        self.filename = filename  # soubor s periodickou tabulkou
+        self.elements = None  # slovník symbol -> (pořadové číslo, elektronegativita, velikost valenční vrstvy)
+
+    def load(self):
+        if self.elements is None:
+            self.elements = {}
+            with open(self.filename, "r", encoding="latin-1") as ftp:
+                for line in ftp:
+                    columns = line.split(",")
+                    record = (get_number(columns[0], int), get_number(columns[11], float) if len(columns) > 11
+                              else None, get_valence_number(columns))
+                    for column in columns[1:-1]:
+                        self.elements.setdefault(column, record)
+        return self.elements
+
+    def get(self, element):
+        """vrátí (pořadové číslo, elektronegativita, velikost valenční vrstvy) nebo None, když prvek není v tabulce"""
+        return self.load().get(element)
+
+
+PERIODIC_TABLE = PeriodicTable("tables/Periodic Table of Elements.csv")
+
+
+def get_number(text, number_type):
+    """převod hodnoty z tabulky na číslo, None pokud hodnota není číslo (např. hlavička tabulky)"""
+    try:
+        return number_type(text)
+    except ValueError:
+        return None
+
+
+"""FUNKCE PRO ZÍSKÁNÍ VELIKOSTI VALENČNÍ VRSTVY Z ŘÁDKU PERIODICKÉ TABULKY"""
+
+
+def get_valence_number(columns):
+    """
+    columns jsou sloupce řádku tabulky, elektronová konfigurace je ve třetím sloupci od konce
+    vrací None, pokud se velikost valenční vrstvy z řádku nepoužije
+    """
+    number = get_number(columns[0], int)  # pořadové číslo v tabulce
+    if number is None or len(columns) < 3:
+        return None
+    try:
+        if number < 3:  # když je to H nebo He, velikost velanční vrstvy je podle poslední číslice
+            return int(columns[-3][2:])
+        """
+        velikost valenční vrstvy se dělá na základě vypsané elektronové konfigurace
+        valence_text slouží pro uložení elektronové konfigurace
+        """
+        valence_number, valence_text = 0, columns[-3][4:]
+        if len(valence_text) > 8:
+            if len(valence_text) > 10:
+                valence_text = valence_text[-8:]
+                """
+                Pokud je valence_text delší, je potřeba vzít pouze s a p konfigurace
+                """
+            else:
+                """
+                valence_text je kratší než 10 znaků a delší než 8, tyto prvky se v tabulce nepoužívaly
+                """
+                return None
+        maximum = int((len(valence_text)) / 4)
+        for i in range(maximum):
+            number = valence_text[3:5].strip()
+            valence_number += int(number)
+            valence_text = valence_text[3 + len(number):]
+            """
+            sčítají se orbitaly s a p a jejich zaplnění
+            """
+        return valence_number
+    except ValueError:
+        return None
+
+
 """FUNKCE PRO ELEKTRONEGATIVITU Z TABULEK MGC"""
 
 
 def get_electronegativity_from_periodic_table(elements):
     periodic_table = {}
     for element in elements:  # list prvků, které jsou v sadě molekul
-        with open("tables/Periodic Table of Elements.csv", "r", encoding="latin-1") as ftp:
-            for line in ftp:
-                if ("," + element + ",") in line:
-                    """
-                    uložení elektronegativity pro každý prvek
-                    """
-                    periodic_table[element] = float(line[[m.start() for m in re.finditer(r",", line)][10] + 1:[
-                        m.start() for m in re.finditer(r",", line)][11]])
-                    break
+        record = PERIODIC_TABLE.get(element)
+        if record is not None:
+            periodic_table[element] = record[1]  # uložení elektronegativity pro každý prvek
     return periodic_table
 
 
@@ -300,80 +625,98 @@ def get_electronegativity_from_periodic_table(elements):
 
 
 def get_orbital_electrons(elements):
-    matrix, orbital_electrons, ionization_potential = 0, Counter(), {}
-    for x, element in enumerate(elements):
-        x += 1
-        with open("tables/Periodic Table of Elements.csv", "r", encoding="latin-1") as ftp:
-            for line in ftp:
-                if ("," + element + ",") in line:  # nalezení prvku v tabulce
-                    number = int(line[0:[m.start() for m in re.finditer(r",", line)][0]])  # pořadové číslov tabulce
-                    if number < 3:  # když je to H nebo He
-                        valence_number = int(line[[m.start() for m in re.finditer(r",", line)][-3] + 3:[
-                            m.start() for m in re.finditer(r",", line)][-2]])
-                        """uložení velikosti velanční vrstvy jde u těchto dvou atomů podle poslední číslice"""
-                    else:
-                        """
-                        velikost valenční vrstvy se dělá na základě vypsané elektronové konfigurace
-                        """
-                        valence_number = 0
-                        valence_text = line[[m.start() for m in re.finditer(r",", line)][-3] + 5:[
-                            m.start() for m in re.finditer(r",", line)][-2]]
-                        """
-                        valence_text slouží pro uložení elektronové konfigurace
-                        """
-
-                        if len(valence_text) > 8:
-                            if len(valence_text) > 10:
-                                valence_text = valence_text[-8:]
-                                """
-                                Pokud je valence_text delší, je potřeba vzít pouze s a p konfigurace
-                                """
-                                if len(valence_text) > 8:
-                                    valence_text = valence_text[-1]
-                                    valence_number = int(valence_text[-1])
-                            else:
-                                """
-                                valence_text je kratší než 10 znaků a delší než 8, tak lze velikost valenční vrstvy vzít 
-                                z posledního čísla v zápise
-                                """
-                                valence_text = valence_text[-1]
-                                valence_number = int(valence_text[-1])
-                                break
-                        maximum = int((len(valence_text)) / 4)
-                        for i in range(maximum):
-                            number = valence_text[3:5].strip()
-                            valence_number += int(number)
-                            valence_text = valence_text[3 + len(number):]
-                            """
-                            sčítají se orbitaly s a p a jejich zaplnění
-                            """
-                    orbital_electrons[x] = valence_number  # valenční velikost jednotlivých atomů
-                    matrix += valence_number  # maximální velikost matic
-                    break
+    matrix, orbital_electrons = 0, Counter()
+    for x, element in enumerate(elements, 1):
+        record = PERIODIC_TABLE.get(element)
+        if record is not None and record[2] is not None:
+            orbital_electrons[x] = record[2]  # valenční velikost jednotlivých atomů
+            matrix += record[2]  # maximální velikost matic
     return matrix, orbital_electrons
 
 
+def get_orbital_positions(orbital_electrons, count_atoms):
+    """
+    prefixové součty velikostí valenčních vrstev, orbital_positions[atom] je začáteční pozice atomu v matici
+    (součet valenčních vrstev atomů před ním), poslední hodnota je velikost matice
+    """
+    return [0] + list(itertools.accumulate(orbital_electrons[atom] for atom in range(0, count_atoms + 1)))
+
+
+"""TŘÍDY PRO TABULKY OGC"""
+
+
+class ValenceStateTable:
+    """
+    Tabulka elektronegativit a tvrdostí se načte ze souboru jen jednou (při prvním použití) do slovníku
+    (prvek, frozenset(valenční stav)) -> {stav orbitalu: (elektronegativita, tvrdost)},
+    při opakování řádku platí poslední.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.states = None
+
+    def load(self):
+        if self.states is None:
+            self.states = {}
+            with open(self.filename, "r", encoding="latin-1") as feh:
+                for line in feh:
+                    columns = line.split(",")
+                    if len(columns) < 5:
+                        continue
+                    try:
+                        values = (float(columns[3]), float(",".join(columns[4:])))
+                    except ValueError:  # hlavička tabulky
+                        continue
+                    self.states.setdefault((columns[0], frozenset(columns[1].split(" "))), {})[columns[2]] = values
+        return self.states
+
+    def get(self, element, state_text):
+        return self.load().get((element, frozenset(state_text)), {})
+
+
+class CovalentRadiiTable:
+    """
+    Tabulka kovalentních poloměrů se načte ze souboru jen jednou (při prvním použití) do slovníku
+    (prvek, maximální vazba) -> kovalentní poloměr, při opakování řádku platí poslední.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.radii = None
+
+    def load(self):
+        if self.radii is None:
+            self.radii = {}
+            with open(self.filename, "r", encoding="latin-1") as fcr:
+                for line in fcr:
+                    columns = line.split(",")
+                    if len(columns) < 3:
+                        continue
+                    try:
+                        self.radii[columns[0], columns[1]] = float(",".join(columns[2:]))
+                    except ValueError:  # hlavička tabulky
+                        continue
+        return self.radii
+
+    def get(self, element, bond):
+        return self.load().get((element, str(bond)), 0)
+
+
+ELECTRONEGATIVITY_HARDNESS = ValenceStateTable("tables/electronegativity_hardness.csv")
+COVALENT_RADII = CovalentRadiiTable("tables/Covalent radii.csv")
+
+
 """FUNKCE PRO ELEKTRONEGATIVITU A TVRDOST Z TABULEK OGC"""
 
 
 def get_electronnegativity_and_hardness(state_text, element):
+    """
+    vyhledává se v tabulce prvek a jeho zaplněná valenční vrstva a uloží se jeho elektronegativita
+    a tvrdost pro všechny jednotlivé stavy
+    """
     table_electronegativity, table_hardness = Counter(), Counter()
-    with open("tables/electronegativity_hardness.csv", "r", encoding="latin-1") as feh:
-        for line in feh:
-            if (element + ",") in line:
-                if set(state_text) == set((line[[m.start() for m in re.finditer(r",", line)][0] + 1:[
-                            m.start() for m in re.finditer(r",", line)][1]]).split(" ")):
-                    table_electronegativity[element, line[[m.start() for m in re.finditer(r",", line)][1] + 1:[
-                                m.start() for m in re.finditer(r",", line)][2]]] = float(
-                        line[[m.start() for m in re.finditer(r",", line)][2] + 1:[
-                                m.start() for m in re.finditer(r",", line)][3]])
-                    table_hardness[element, line[[m.start() for m in re.finditer(r",", line)][1] + 1:[
-                                m.start() for m in re.finditer(r",", line)][2]]] = float(
-                        line[[m.start() for m in re.finditer(r",", line)][3] + 1:])
-                    """
-                    vyhledává se v tabulce prvek a jeho zaplněná valenční vrstva a uloží se jeho elektronegativita 
-                    a tvrdost pro všechny jednotlivé stavy
-                    """
+    for state, (electronegativity, hardness) in ELECTRONEGATIVITY_HARDNESS.get(element, state_text).items():
+        table_electronegativity[element, state] = electronegativity
+        table_hardness[element, state] = hardness
     return table_electronegativity, table_hardness
 
 
@@ -381,101 +724,107 @@ def get_electronnegativity_and_hardness(state_text, element):
 
 
 def get_covalent_radii(element, bond):
-    covalent_radius = 0
-    with open("tables/Covalent radii.csv", "r", encoding="latin-1") as fcr:
-        for line in fcr:
-            if (element + "," + str(bond)) in line:
-                covalent_radius = float(line[[m.start() for m in re.finditer(r",", line)][1] + 1:])
-                """
-                hledání v tabulce podle symbolu prvku a jeho maximální vazby 
-                """
-    return covalent_radius
+    """hledání v tabulce podle symbolu prvku a jeho maximální vazby"""
+    return COVALENT_RADII.get(element, bond)
+
+
+"""FUNKCE PRO VALENČNÍ STAV ATOMU"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_atom_valence_state(element, bonds, valence_electrons):
+    """
+    bonds jsou vazby atomu, jak jdou za sebou v souboru, valence_electrons je velikost valenční vrstvy atomu
+    výsledek závisí jen na těchto hodnotách, proto se pro každé okolí atomu počítá jen jednou
+    vrací valenční stav, elektronegativity, tvrdosti a kovalentní poloměr jednotlivých orbitalů a posuny řádků
+    s volnými elektronovými páry (vůči začátku atomu v matici), které se z matic odstraní
+    """
+    covalent_radius = get_covalent_radii(element, max(bonds))
+    """ 
+    zjištění kovalentního poloměru atomu podle maximálí vazby
+    """
+    state_text, filled_type_state, non_binding_pair, sigma = [], 1, 0, 0
+    prepare = valence_electrons - sum(bonds)
+    long_state, index_state, text, filled = valence_electrons, 4 - (min(4, valence_electrons) - 1), "", 0
+    """
+    long_state je nastaven maximálně pro 4 vazbené atomy, jelikož pro více nejsou zahrnuty v použitých tabulkových
+    hodnot
+    """
+    if prepare/2 >= 1:
+        long_state = int(valence_electrons - (prepare/2))
+        """ 
+        prepare slouží k zjištění zda jsou všechny elektrony ve vazbě nebo se v něm nachází volný elektronový pár
+        """
+    if sum(bonds) - len(bonds) > 0:
+        index_state = sum(bonds) - len(bonds) + 1
+        """
+        určení znaku pro sigma vazbu, když nemá jen sigma vazby.
+        """
+    electron_states = ["s", "di", "tr", "te"]  # znak pro příslušnou sigma vazbu
+    divisor = 2  # dělitel
+    for bond in bonds:  # načítání po jednotlivých vazbách v atomu
+        if bond > 1:  # zapsání pi vazby
+            for x in range(bond - 1):
+                state_text.append("pi")
+                filled_type_state += 1
+                filled += 1  # číslo zaplnění
+            state_text.append(electron_states[-index_state])
+            filled_type_state += 1
+            filled += 1
+            divisor = 2
+            """
+            zapíše se pi vazby a sigma vazba a číslo zaplnění se zvýči o počet pi vazeb a jednu sigma vazbu
+            """
+        else:
+            state_text.append(electron_states[-index_state])
+            filled += 1
+            """
+            zapsání sigma vazby s příslušným znakem
+            """
+    if ((valence_electrons - filled) / divisor) >= 1:
+        for y in range((valence_electrons - filled) - (long_state - filled)):
+            state_text.append(electron_states[-index_state] + "2")
+            non_binding_pair += 1
+            """
+            po projití vazeb atomu se přiřazují volné elektronové páry, pokud se v aotmu nachází
+            """
+    """
+    načtení tabulkových hodnot elektronegativit a tvrdosti
+    """
+    electronegativity, hardness = get_electronnegativity_and_hardness(state_text, element)
+    dive, delete_rows = 1, []
+    for move, state in enumerate(state_text):
+        if "2" in state:
+            """ 
+            když je v atomu volný elektronový pár, tak se zapíše pořadí posledních elektornů, jejichž množství je
+            rovno počtu volných elektronových párů
+            """
+            if move <= 3:
+                dive += 1
+            delete_rows.append(len(state_text) - 2 + dive)
+    return (tuple(state_text), tuple(electronegativity[element, state] for state in state_text),
+            tuple(hardness[element, state] for state in state_text), covalent_radius, tuple(delete_rows))
 
 
 """FUNKCE PRO DETEKCI VAZBY NA JEDNOTLIVÝCH ELEKTRONECH A PŘÍPRAVA MATIC"""
 
 
-def get_valence_state_and_prepare_table_values(bond_info, elements, orbital_electrons, max_bond,
+def get_valence_state_and_prepare_table_values(bond_info, elements, orbital_electrons, orbital_positions, max_bond,
                                                table_electronegativity, table_hardness, matrix_covalent_radii):
-    covalent_radius, valence_state, delete_rows = {}, {}, []
+    valence_state, delete_rows = {}, []
     orbital_electrons[0] = 0
     for number_element in bond_info:
         """ 
         uložili jsme si pro každý atom všechny jeho vazby jak jdou za sebou
         """
-        position = 0
-        for valence in range(0, number_element):
-            position += orbital_electrons[valence]  # zjištění pozice atomu v maticích
-        covalent_radius[elements[number_element - 1], max(bond_info[number_element])] = get_covalent_radii(
-            elements[number_element - 1], max(bond_info[number_element]))
-        """ 
-        zjištění kovalentního poloměru atomu podle maximálí vazby
-        """
-        state_text, filled_type_state, non_binding_pair, sigma = [], 1, 0, 0
-        valence_electrons = orbital_electrons[number_element]  # počet valenčních elektronů v atomu
-        prepare = valence_electrons - sum(bond_info[number_element])
-        long_state, index_state, text, filled = valence_electrons, 4 - (min(4, valence_electrons) - 1), "", 0
-        """
-        long_state je nastaven maximálně pro 4 vazbené atomy, jelikož pro více nejsou zahrnuty v použitých tabulkových
-        hodnot
-        """
-        if prepare/2 >= 1:
-            long_state = int(valence_electrons - (prepare/2))
-            """ 
-            prepare slouží k zjištění zda jsou všechny elektrony ve vazbě nebo se v něm nachází volný elektronový pár
-            """
-        if sum(bond_info[number_element]) - len(bond_info[number_element]) > 0:
-            index_state = sum(bond_info[number_element]) - len(bond_info[number_element]) + 1
-            """
-            určení znaku pro sigma vazbu, když nemá jen sigma vazby.
-            """
-        electron_states = ["s", "di", "tr", "te"]  # znak pro příslušnou sigma vazbu
-        divisor = 2  # dělitel
-        for bond in bond_info[number_element]:  # načítání po jednotlivých vazbách v atomu
-            if bond > 1:  # zapsání pi vazby
-                for x in range(bond - 1):
-                    state_text.append("pi")
-                    filled_type_state += 1
-                    filled += 1  # číslo zaplnění
-                state_text.append(electron_states[-index_state])
-                filled_type_state += 1
-                filled += 1
-                divisor = 2
-                """
-                zapíše se pi vazby a sigma vazba a číslo zaplnění se zvýči o počet pi vazeb a jednu sigma vazbu
-                """
-            else:
-                state_text.append(electron_states[-index_state])
-                filled += 1
-                """
-                zapsání sigma vazby s příslušným znakem
-                """
-        if ((valence_electrons - filled) / divisor) >= 1:
-            for y in range((valence_electrons - filled) - (long_state - filled)):
-                state_text.append(electron_states[-index_state] + "2")
-                non_binding_pair += 1
-                """
-                po projití vazeb atomu se přiřazují volné elektronové páry, pokud se v aotmu nachází
-                """
-        """
-        načtení tabulkových hodnot elektronegativit a tvrdosti
-        """
-        electronegativity, hardness = get_electronnegativity_and_hardness(state_text, elements[number_element - 1])
+        position = orbital_positions[number_element]  # pozice atomu v maticích
+        state_text, electronegativity, hardness, covalent_radius, delete_shifts = get_atom_valence_state(
+            elements[number_element - 1], tuple(bond_info[number_element]), orbital_electrons[number_element])
         valence_state[number_element] = state_text  # uložení valenčního stavu atomu
-        dive = 1
-        for move, state in enumerate(state_text):  # zaplnění vektorů potřebné pro finální počítání
-            table_electronegativity[position + move][0] = electronegativity[
-                elements[number_element - 1], state]
-            table_hardness[position + move][0] = hardness[elements[number_element - 1], state]
-            matrix_covalent_radii[position + move][0] = covalent_radius[elements[number_element - 1],
-                                                                        max(bond_info[number_element])]
-            if "2" in state:  #
-                """ 
-                když je v atomu volný elektronový pár, tak se zapíše pořadí posledních elektornů, jejichž množství je
-                rovno počtu volných elektronových párů
-                """
-                if move <= 3:
-                    dive += 1
-                delete_rows.append(int(position + len(state_text) - 2 + dive))
+        for move in range(len(state_text)):  # zaplnění vektorů potřebné pro finální počítání
+            table_electronegativity[position + move][0] = electronegativity[move]
+            table_hardness[position + move][0] = hardness[move]
+            matrix_covalent_radii[position + move][0] = covalent_radius
+        delete_rows.extend(position + shift for shift in delete_shifts)
     return orbital_electrons, max_bond, table_electronegativity, table_hardness, matrix_covalent_radii, valence_state,\
            delete_rows
@@ -0,0 +1,302 @@
+import itertools  # pro procházení obou souborů současně
+import sys  # pro ukončení práce při chybném souboru
+import numpy as np  # knihovna NumPy
+import chargefile  # chargefile.py
+
+from collections import defaultdict  # knihovna pro použití funkce defaultdict()
+
+
+"""
+Načtení a porovnání dvou souborů s náboji a statistika po prvcích bez knihovny Matplotlib,
+lze použít i samostatně (např. v dávkových úlohách): table, pcc = comparison.compare_files(file1, file2)
+"""
+STATISTICS_DTYPE = np.dtype([("element", "U8"), ("count", np.int64), ("mae", np.float64), ("absmax", np.float64),
+                             ("rmsd", np.float64), ("pcc", np.float64)])
+STREAM_ATOMS = 1 << 16  # po kolika atomech se při postupném porovnání souborů aktualizuje statistika
+
+
+def compare_files(file1, file2):
+    """vrací tabulku statistik po prvcích (get_statistics_table) a celkovou korelaci obou souborů"""
+    ready1, ready2 = compare_data(load_files(file1), load_files(file2))
+    return get_statistics_table(ready1, ready2), get_pcc_for_all_graph(ready1, ready2)
+
+
+def two_pass_compare(file1, file2):
+    """
+    stejný výsledek jako compare_files pro soubory se stejným pořadím molekul (výstupy výpočtů ze stejné sady),
+    soubory se procházejí současně dvakrát a statistika prvků se počítá průběžně (RunningStatistics) v konstantní
+    paměti, první průchod spočítá počty, průměry, ABSMAX, RMSD a PCC, druhý průchod MAE, které je odchylkou
+    od společného průměru prvku známého až po prvním průchodu
+    pokud se liší názvy molekul nebo jejich atomy na stejném místě, porovnají se molekuly podle názvu (compare_files)
+    """
+    statistics, total = {}, RunningStatistics()
+    for chunk in iter_chunks(file1, file2):
+        if chunk is None:
+            print("Files have different order of molecules, molecules are matched by name")
+            return compare_files(file1, file2)
+        labels, inverse, x, y = chunk
+        for label, values in zip(labels, batch_statistics(x, y, inverse, len(labels))):
+            statistics.setdefault(label, RunningStatistics()).update(*values)
+        total.update(*next(batch_statistics(x, y, np.zeros_like(inverse), 1)))
+    """druhý průchod (soubory se čtou znovu): odchylky nábojů obou souborů od společného průměru prvku"""
+    for labels, inverse, x, y in iter_chunks(file1, file2):
+        means = np.array([statistics[label].mean for label in labels])[inverse]
+        deviations = np.bincount(inverse, np.abs(x - means) + np.abs(y - means), len(labels))
+        for label, deviation in zip(labels, deviations.tolist()):
+            statistics[label].deviations += deviation
+    rows = [(label, item.count, item.mae, item.absmax, item.rmsd, item.pcc) for label, item in statistics.items()]
+    return np.array(rows, dtype=STATISTICS_DTYPE), total.pcc
+
+
+def iter_chunks(file1, file2):
+    """
+    dvojice nábojů atomů obou souborů po nejvýše STREAM_ATOMS atomech (celé molekuly) jako
+    (prvky, index prvku každého atomu, náboje z file1, náboje z file2), prvky jsou v pořadí prvního výskytu
+    pokud se molekuly na stejném místě v souborech liší, vrátí None a skončí
+    """
+    elements, charges1, charges2 = [], [], []
+    for molecule1, molecule2 in itertools.zip_longest(iter_files(file1), iter_files(file2)):
+        if molecule1 is None or molecule2 is None or molecule1[0] != molecule2[0] or \
+                [element for element, _ in molecule1[1]] != [element for element, _ in molecule2[1]]:
+            yield None
+            return
+        for (element, charge1), (_, charge2) in zip(molecule1[1], molecule2[1]):
+            elements.append(element)
+            charges1.append(charge1)
+            charges2.append(charge2)
+        if len(elements) >= STREAM_ATOMS:
+            yield get_chunk(elements, charges1, charges2)
+            elements, charges1, charges2 = [], [], []
+    if elements:
+        yield get_chunk(elements, charges1, charges2)
+
+
+def get_chunk(elements, charges1, charges2):
+    symbols, first, inverse = np.unique(elements, return_index=True, return_inverse=True)
+    order = np.argsort(first)  # prvky v pořadí prvního výskytu
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.shape[0])
+    return symbols[order].tolist(), rank[inverse], np.array(charges1, dtype=float), np.array(charges2, dtype=float)
+
+
+def batch_statistics(x, y, inverse, groups):
+    """
+    pro každou skupinu atomů (inverse je skupina každého atomu) počet, průměry, součty čtverců odchylek
+    od průměru, součet součinů odchylek, součet čtverců rozdílů a největší absolutní rozdíl (RunningStatistics.update)
+    """
+    count = np.bincount(inverse, minlength=groups)
+    mean_x, mean_y = np.bincount(inverse, x, groups) / count, np.bincount(inverse, y, groups) / count
+    deviation_x, deviation_y, difference = x - mean_x[inverse], y - mean_y[inverse], x - y
+    absmax = np.zeros(groups)
+    np.maximum.at(absmax, inverse, np.abs(difference))
+    return zip(count.tolist(), mean_x.tolist(), mean_y.tolist(),
+               np.bincount(inverse, deviation_x * deviation_x, groups).tolist(),
+               np.bincount(inverse, deviation_y * deviation_y, groups).tolist(),
+               np.bincount(inverse, deviation_x * deviation_y, groups).tolist(),
+               np.bincount(inverse, difference * difference, groups).tolist(), absmax.tolist())
+
+
+class RunningStatistics:
+    """
+    průběžná statistika dvojic nábojů (x, y) jednoho prvku bez uložení nábojů, dávky se slučují
+    Welfordovým postupem (Chan et al.) pro průměry, rozptyly a kovarianci
+    deviations je součet odchylek nábojů od společného průměru (druhý průchod pro MAE)
+    """
+    def __init__(self):
+        self.count, self.mean_x, self.mean_y, self.m2_x, self.m2_y, self.c_xy = 0, 0.0, 0.0, 0.0, 0.0, 0.0
+        self.squares, self.absmax, self.deviations = 0.0, 0.0, 0.0
+
+    def update(self, count, mean_x, mean_y, m2_x, m2_y, c_xy, squares, absmax):
+        """připojí dávku count dvojic s jejich průměry a součty odchylek od nich"""
+        if count == 0:
+            return
+        total = self.count + count
+        delta_x, delta_y, weight = mean_x - self.mean_x, mean_y - self.mean_y, self.count * count / total
+        self.m2_x += m2_x + delta_x * delta_x * weight
+        self.m2_y += m2_y + delta_y * delta_y * weight
+        self.c_xy += c_xy + delta_x * delta_y * weight
+        self.mean_x += delta_x * count / total
+        self.mean_y += delta_y * count / total
+        self.squares += squares
+        self.absmax = max(self.absmax, absmax)
+        self.count = total
+
+    @property
+    def mean(self):
+        """společný průměr nábojů obou souborů"""
+        return (self.mean_x + self.mean_y) / 2
+
+    @property
+    def mae(self):
+        return self.deviations / (2 * self.count)
+
+    @property
+    def rmsd(self):
+        return np.sqrt(self.squares / self.count)
+
+    @property
+    def pcc(self):
+        """stejně jako get_pcc nan pro jeden náboj nebo stejné náboje"""
+        if self.count < 2:
+            return np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.float64(self.c_xy) / np.sqrt(self.m2_x * self.m2_y)
+
+
+"""NAČTENÍ DAT"""
+
+
+def load_files(file):
+    """všechny molekuly ze souboru s náboji seřazené podle názvu"""
+    return sorted(iter_files(file))
+
+
+def iter_files(file):
+    """
+    molekuly (název, [(prvek s vazbou, náboj)]) postupně v pořadí souboru, v paměti je vždy jen část souboru
+    soubor je textový (výpočty ogcm.py, mgcm.py nebo eem.py) nebo adresář s binárními soubory (calculation --binary)
+    """
+    if chargefile.is_binary(file):
+        yield from iter_binary_file(file)
+        return
+    try:
+        with open(file, "r") as f1:
+            while True:
+                """načtení souboru s náboji (načítá uložené soubory z výpočtů ogcm.py, mgcm.py nebo eem.py)"""
+                element_charge, line = [], f1.readline()
+                if "" == line[0:1]:
+                    break
+                name = line[:].strip()
+                line = f1.readline()
+                count = int(line[:].strip())
+                """zjištění názvu, počtu atomů, jednotlivých atomů s maximální vazbou a jejich nábojů """
+                for i in range(count):
+                    line = f1.readline()
+                    element = line[6:11].strip()
+                    charge = float(line[11:].strip())
+                    element_charge.append((element, charge))
+                yield name, element_charge
+    except IOError:
+        print("Wrong file for graph! Try another file than {}".format(file))
+        sys.exit(1)
+
+
+def iter_binary_file(file, block=10000):
+    """binární soubor s náboji, prvky s vazbou se převádí na text najednou pro block molekul"""
+    names, offsets, atoms, charges = chargefile.load_binary(file)
+    for first in range(0, offsets.shape[0] - 1, block):
+        bounds = offsets[first:first + block + 1].tolist()
+        records = atoms[bounds[0]:bounds[-1]]
+        labels = np.char.add(np.char.decode(records["element"]), records["bond"].astype(str)).tolist()
+        values = charges[bounds[0]:bounds[-1]].tolist()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            yield next(names), list(zip(labels[start - bounds[0]:end - bounds[0]],
+                                        values[start - bounds[0]:end - bounds[0]]))
+
+
+"""POROVNÁNÍ MOLEKUL Z OBOU SAD"""
+
+
+def compare_data(data1, data2):
+    first_data, second_data, index2, matched2 = [], [], defaultdict(list), set()
+    """
+    Zjištění zda sady obsahují stejné molekuly a ty se uloží do porovnání. Pokud je molekula, která je jen v 
+    jedné sadě, tak je vynechána
+    molekuly druhé sady se najdou podle názvu ve slovníku index2 (název -> molekuly se stejným názvem v pořadí sady),
+    každá dvojice molekul se stejným názvem se porovná jako dřív při procházení obou sad
+    """
+    for name2, elements2 in data2:
+        index2[name2].append(elements2)
+    unmatched1 = 0
+    for name1, elements1 in data1:
+        if name1 not in index2:
+            unmatched1 += 1
+            continue
+        matched2.add(name1)
+        for elements2 in index2[name1]:
+            first_data.append(elements1)
+            second_data.append(elements2)
+    unmatched2 = sum(len(index2[name]) for name in index2 if name not in matched2)
+    print("Unmatched molecules: {} only in first file, {} only in second file".format(unmatched1, unmatched2))
+    ready1 = prepare_data(first_data)  # příprava dat ze sad
+    ready2 = prepare_data(second_data)
+    return ready1, ready2
+
+
+"""PŘÍPRAVA DAT ZE SAD"""
+
+
+def prepare_data(crude_data):
+    """
+    náboje všech atomů se projdou jednou a rozdělí podle prvku do souvislých polí NumPy,
+    prvky jsou v pořadí prvního výskytu, náboje prvku v pořadí molekul a atomů v nich
+    """
+    elements = [element for molecule in crude_data for element, _ in molecule]
+    charges = np.array([charge for molecule in crude_data for _, charge in molecule], dtype=float)
+    if not elements:
+        return {}
+    symbols, first, inverse = np.unique(elements, return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")  # stabilní řazení zachová pořadí nábojů v rámci prvku
+    groups = np.split(charges[order], np.cumsum(np.bincount(inverse))[:-1])
+    return {symbols[index]: groups[index] for index in np.argsort(first)}
+
+
+"""STATISTIKA"""
+
+
+def get_statistics_table(element_data1, element_data2):
+    """
+    MAE, ABSMAX, RMSD a PCC pro prvky, které jsou v obou sadách, počítané vektorově nad poli prvků
+    MAE je průměrná odchylka nábojů obou sad od jejich společného průměru, ostatní se počítají z dvojic nábojů
+    vrací strukturované pole STATISTICS_DTYPE, jeden řádek pro každý prvek
+    """
+    rows = []
+    for element, charges1 in element_data1.items():
+        if element not in element_data2:
+            continue
+        charges2 = element_data2[element]
+        count = min(charges1.shape[0], charges2.shape[0])  # dvojice nábojů jako při procházení zip()
+        if count == 0:
+            continue
+        x, y = charges1[:count], charges2[:count]
+        charges = np.concatenate((charges1, charges2))
+        mean = (x.sum() + y.sum()) / charges.shape[0]
+        mae = np.abs(charges - mean).mean()
+        difference = x - y
+        absmax = np.abs(difference).max()
+        rmsd = np.sqrt(np.mean(difference * difference))
+        rows.append((element, count, mae, absmax, rmsd, get_pcc(x, y)))
+    return np.array(rows, dtype=STATISTICS_DTYPE)
+
+
+def get_pcc(x, y):
+    """Pearsonův korelační koeficient, nan pokud nelze spočítat (jeden náboj nebo stejné náboje)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.corrcoef(x, y)[1, 0] if x.shape[0] > 1 else np.nan
+
+
+"""ZJIŠTĚNÍ CELKOVÉ KORELACE"""
+
+
+def get_pcc_for_all_graph(charges1, charges2):
+    """korelace všech dvojic nábojů prvků, které jsou v obou sadách"""
+    data_x, data_y = [], []
+    for element in charges1:
+        if element in charges2:
+            count = min(charges1[element].shape[0], charges2[element].shape[0])
+            data_x.append(charges1[element][:count])
+            data_y.append(charges2[element][:count])
+    if not data_x:
+        return np.nan
+    return get_pcc(np.concatenate(data_x), np.concatenate(data_y))
+
+
+"""VYPSAT STATISTIKU"""
+
+
+def print_statistics(statistics, pcc_graph):
+    """vypíše statistiku v terminálu."""
+    print("Element          MAE      ABSMAX     RMSD        PCC")
+    for element, count, mae, maximum, rmsd, pcc in statistics:
+        print("{:<10} {: >9.3} {: >11.3} {: >8.3} {: >10.3}".format(element, mae, maximum, rmsd, pcc))
+    print("r = {}". format(pcc_graph))
@@ -1,72 +1,354 @@
 import math  # knihovna pro použití matematických funkcí
 import numpy as np  # knihovna NumPy
+import solver  # solver.py
+import chargefile  # chargefile.py
 
 
 class Calculate:
-    def __init__(self, molecules, parameters):
-        self.parameters, self.molecules, self.output, atom_parameter, error_molecules = parameters, molecules, [], {}, 0
+    def __init__(self, molecules, parameters, batch=False, output=None, binary=False, linear_solver="lu"):
+        """linear_solver je řešič soustav (solver.LINEAR_SOLVERS), "schur" využívá ohraničenou matici EEM"""
+        self.parameters, self.molecules, self.output, self.atom_parameter = parameters, molecules, [], {}
+        self.calculated_molecules, self.file, self.linear_solver = 0, None, linear_solver
+        if output:  # náboje se zapisují do souboru hned po spočítání molekuly (textového nebo binárního)
+            self.file = chargefile.open_output(output, binary)
         try:
             kappa, yes_type, parameters = self.parameters
-            """příprava parametrů pro atomy s určitou vazbou"""
-            for element, type_bond, parameter in parameters:
-                a_parameter, b_parameter = parameter[0]
-                atom_parameter[element, "A", type_bond] = a_parameter
-                atom_parameter[element, "B", type_bond] = b_parameter
-            for molecule in self.molecules:
-                data_from_atoms, name = [], molecule.name
-                count = molecule.count_atoms  # součet atomů v molekule
-                """příprava matic a vektoru"""
-                distance = np.zeros((count + 1, count + 1))
-                parameters_a = np.zeros((count + 1))
-                try:
-                    """Vkládání do matic paramtery a vypočítané vzdálenosti"""
-                    for i, atom in enumerate(molecule.atoms):
-                        data_from_atoms.append((atom.element_symbol, atom.number, atom.bond))
-                        if not yes_type:
-                            atom.bond = 1
-                        parameters_a[i] = - atom_parameter[atom.element_symbol, "A", atom.bond]
-                        for j in range(i, count):
-                            if i == j:
-                                distance[i, j] = atom_parameter[atom.element_symbol, "B", atom.bond]
-                            else:
-                                distance[i, j] = distance[j, i] = get_distance(kappa,
-                                                                               molecule.atoms[i].coordinate,
-                                                                               molecule.atoms[j].coordinate)
-                    error_molecules += 1
-                except KeyError:
-                    print("Missing parameters for {}. element {}({}) in {}. Program did not count with this "
-                          "element.".format(atom.number, atom.element_symbol, atom.bond, name))
-                    self.output.append((name, "error", atom.element_symbol, 0, atom_parameter))
+            self.atom_parameter = get_atom_parameters(parameters)  # příprava parametrů pro atomy s určitou vazbou
+            systems = self.prepare_systems(kappa, yes_type)
+            for (name, count, data_from_atoms), charges in self.solve(systems, batch):
+                if charges is None:
+                    print("Can not calculate for ", name)
                     continue
-                distance[count, :] = 1  # přidání řádku s 1
-                distance[:, count] = -1  # přidání sloupce s -1
-                distance[count, count] = 0
-                """výpočet nábojů"""
-                charges = np.linalg.solve(distance, parameters_a)
-                self.output.append((name, count, data_from_atoms, charges, atom_parameter))
-            print("Program calculated {} molecules.".format(error_molecules))
+                self.store((name, count, data_from_atoms, charges, self.atom_parameter))
+            print("Program calculated {} molecules.".format(self.calculated_molecules))
         except KeyError:
             print("Something wrong with calculate")
+        if self.file:
+            self.file.close()
+            print("Now you can find charge for each element in file {}".format(self.file.name))
 
-    def save_charges(self, file):  # uložení do souboru
-        data_for_graph, data = [], self.output
-        new_file = "result/" + file
-        with open(new_file, "w") as f:
-            for name, count, atoms, charges, parameters in data:
-                try:
-                    print("{}\n{}".format(name, int(count)), file=f)
-                    for i, atom in enumerate(atoms):
-                        element, number, bond = atom
-                        print("{0:6d}  {1:>2}{2} {3: f}".format(number, element, bond, charges[i]), file=f)
-                    data_for_graph.append((name, count, atoms, charges, parameters))
-                except ValueError:
-                    continue
-        print("Now you can find charge for each element in file {}".format(new_file))
+    def solve(self, systems, batch):
+        """výpočet nábojů, v dávkovém režimu se soustavy stejné velikosti řeší najednou"""
+        return solver.solve_in_batches(systems, solver.BATCH_SIZE if batch else 1, self.linear_solver)
+
+    def prepare_parameters(self, molecule, yes_type):
+        """
+        vektory parametrů A (s nulou pro celkový náboj) a B atomů molekuly a údaje atomů pro zápis nábojů,
+        při chybějícím parametru se uloží chyba a vrátí se None
+        """
+        atom_parameter, data_from_atoms, name = self.atom_parameter, [], molecule.name
+        parameters_a = np.zeros((molecule.count_atoms + 1))
+        parameters_b = np.zeros((molecule.numbers.shape[0]))
+        try:
+            """Vkládání paramterů do vektorů"""
+            for i, (element, number, bond) in enumerate(zip(molecule.element_symbols, molecule.numbers.tolist(),
+                                                            molecule.bonds.tolist())):
+                data_from_atoms.append((element, number, bond))
+                if not yes_type:
+                    bond = 1  # vazba se v molekule nemění, používají ji další metody
+                parameters_a[i] = - atom_parameter[element, "A", bond]
+                parameters_b[i] = atom_parameter[element, "B", bond]
+            self.calculated_molecules += 1
+        except KeyError:
+            print("Missing parameters for {}. element {}({}) in {}. Program did not count with this "
+                  "element.".format(number, element, bond, name))
+            self.store((name, "error", element, 0, atom_parameter))
+            return None
+        return data_from_atoms, parameters_a, parameters_b
+
+    def prepare_systems(self, kappa, yes_type):
+        for molecule in self.molecules:
+            name, count = molecule.name, molecule.count_atoms  # součet atomů v molekule
+            prepared = self.prepare_parameters(molecule, yes_type)
+            if prepared is None:
+                continue
+            data_from_atoms, parameters_a, parameters_b = prepared
+            """příprava matice"""
+            distance = np.zeros((count + 1, count + 1))
+            """Vložení vypočítaných vzdáleností (mimo diagonálu) a parametru B (na diagonálu) do matice"""
+            atoms_count = parameters_b.shape[0]
+            get_distance_matrix(kappa, molecule.coordinates, distance[:atoms_count, :atoms_count])
+            distance[np.arange(atoms_count), np.arange(atoms_count)] = parameters_b
+            distance[count, :] = 1  # přidání řádku s 1
+            distance[:, count] = -1  # přidání sloupce s -1
+            distance[count, count] = 0
+            yield (name, count, data_from_atoms), distance, parameters_a
+
+    def store(self, result):
+        """uložení výsledku molekuly do output, nebo rovnou do souboru při průběžném zápisu"""
+        if self.file:
+            self.write_molecule(self.file, result)
+        else:
+            self.output.append(result)
+
+    def save_charges(self, file, binary=False):  # uložení do souboru (název v result, cesta nebo proud)
+        f = chargefile.open_output(file, binary)
+        for result in self.output:
+            self.write_molecule(f, result)
+        f.close()
+        print("Now you can find charge for each element in file {}".format(f.name))
+
+    def write_molecule(self, f, result):
+        name, count, atoms, charges, parameters = result
+        if isinstance(f, chargefile.BinaryWriter):
+            if count != "error":  # molekula s chybějícími parametry se nezapíše ani do textového souboru
+                f.write_molecule(name, [(number, element, bond) for element, number, bond in atoms], charges)
+            return
+        try:  # celý blok molekuly se zformátuje najednou
+            charges = np.asarray(charges, dtype=float).ravel().tolist()
+            f.write(chargefile.format_molecule(name, count, [(number, element, bond, charges[i])
+                                                             for i, (element, number, bond) in enumerate(atoms)]))
+        except ValueError:
+            pass
 
     def give_result(self):
         return self.output
 
 
+"""VÝPOČET PRO KONFORMERY"""
+
+
+CONFORMERS_MIN_ATOMS = 500  # konformery menších molekul se řeší přímo, zpřesnění není rychlejší než rozklad matice
+
+
+class Conformers(Calculate):
+    """
+    EEM pro soubory s konformery (molekuly se stejným názvem, atomy a vazbami jdou za sebou a liší se souřadnicemi)
+    parametry atomů se pro konformery stejné molekuly připraví jen jednou, první konformer se řeší rozkladem LU,
+    další (u molekul alespoň s CONFORMERS_MIN_ATOMS atomy) se zpřesní z nábojů předchozího konformeru metodou
+    GMRES předpodmíněnou tímto rozkladem (solver.refine), rozklad se spočítá znovu, když se konformery příliš liší
+    """
+    def __init__(self, molecules, parameters, output=None, binary=False):
+        self.topology, self.count_solved, self.count_factorized, self.count_refined = None, 0, 0, 0
+        super().__init__(molecules, parameters, False, output, binary)
+
+    def prepare_parameters(self, molecule, yes_type):
+        """konformer se stejnou topologií jako předchozí molekula použije její připravené parametry"""
+        if self.topology is not None and is_same_topology(self.topology[0], molecule):
+            self.calculated_molecules += 1
+            return self.topology[1]
+        prepared = super().prepare_parameters(molecule, yes_type)
+        self.topology = None if prepared is None else ((molecule.name, molecule.elements, molecule.bond_pairs),
+                                                       prepared)
+        return prepared
+
+    def solve(self, systems, batch):
+        """
+        konformery stejné molekuly mají stejný seznam data_from_atoms (prepare_parameters)
+        když se nepodaří zpřesnit ani konformer hned po rozkladu předchozího konformeru, konformery se příliš liší
+        a další konformery molekuly se řeší stejně jako v Calculate
+        """
+        atoms = factorization = charges = None
+        refine = fresh = False
+        for data, matrix, vector in systems:
+            if data[2] is not atoms:  # první konformer molekuly
+                atoms, factorization, charges = data[2], None, None
+                refine = data[1] >= CONFORMERS_MIN_ATOMS
+            refined = None
+            if refine and factorization is not None and charges is not None:
+                refined = solver.refine(matrix, vector, factorization, charges)
+                if refined is None:  # bez zpřesnění i s rozkladem předchozího konformeru se už nezpřesňuje
+                    refine = not fresh
+            if refined is not None:
+                charges, fresh = refined, False
+                self.count_refined += 1
+            elif refine:  # rozklad tohoto konformeru pro další konformery
+                factorization, fresh = solver.factorize(matrix), True
+                charges = None if factorization is None else solver.solve_factorized(factorization, vector)
+                self.count_factorized += 1
+            else:
+                charges = solver.solve_one(matrix, vector)
+                self.count_solved += 1
+            yield data, charges
+        print("Conformers: {} solved directly, {} solved with new LU factorization, {} refined from previous "
+              "conformer.".format(self.count_solved, self.count_factorized, self.count_refined))
+
+
+def is_same_topology(topology, molecule):
+    """topology je trojice (název, prvky, vazby mezi atomy s jejich řádem) předchozí molekuly"""
+    name, elements, bond_pairs = topology
+    return name == molecule.name and np.array_equal(elements, molecule.elements) and \
+        np.array_equal(bond_pairs, molecule.bond_pairs)
+
+
+"""VÝPOČET VELKÝCH MOLEKUL S CUTOFF"""
+
+
+class Cutoff(Calculate):
+    """
+    EEM pro velké molekuly (proteiny, komplexy): kappa / r jen pro dvojice atomů vzdálené nejvýše cutoff (Å),
+    matice soustavy je řídká a řeší se iterativně (solver.solve_iterative), paměť i čas rostou s počtem dvojic
+    místo s druhou (paměť) a třetí (čas) mocninou počtu atomů, potřebuje knihovnu SciPy
+    s damping je interakce posunutá, aby u cutoff klesla k nule (get_cutoff_matrix), a diagonála se opraví o stejný
+    posun, výsledek je pak stejný jako EEM, ve které dvojice vzdálenější než cutoff mají kappa / cutoff místo
+    kappa / r, a s cutoff větším než největší vzdálenost atomů je stejný jako EEM bez cutoff, bez damping useknutí
+    u cutoff změní náboje až o desítky e, proto je damping výchozí
+    """
+    def __init__(self, molecules, parameters, cutoff, damping=True, output=None, binary=False):
+        self.cutoff, self.damping = cutoff, damping
+        super().__init__(molecules, parameters, False, output, binary)
+
+    def solve(self, systems, batch):
+        """
+        soustava je symetrická s posledním řádkem a sloupcem -1 pro celkový náboj, předpodmínění je převrácená
+        absolutní hodnota diagonály a pro poslední řádek převrácený součet 1 / |B| (přibližný Schurův doplněk),
+        téměř singulární soustavy (velké molekuly s malými B, náboje řádově desítky a více) iterace neřeší
+        a řeší se přímo (solver.solve_sparse)
+        konformer se stejnými atomy jako předchozí molekula začíná iterace z jejích nábojů
+        """
+        previous = charges = None
+        for data, matrix, vector in systems:
+            x0 = charges if previous is not None and previous[0] == data[0] and previous[1] == data[2] else None
+            diagonal = np.abs(matrix.diagonal()[:-1])
+            with np.errstate(divide="ignore"):
+                preconditioner = np.append(1.0 / diagonal, 1.0 / np.sum(1.0 / diagonal))
+            if not np.all(np.isfinite(preconditioner)):  # parametr B je nula
+                preconditioner = np.ones(matrix.shape[0])
+            charges = solver.solve_iterative(matrix, vector, preconditioner, x0)
+            if charges is None:
+                charges = solver.solve_sparse(matrix, vector)
+            previous = data[0], data[2]
+            yield data, charges
+
+    def prepare_systems(self, kappa, yes_type):
+        for molecule in self.molecules:
+            prepared = self.prepare_parameters(molecule, yes_type)
+            if prepared is None:
+                continue
+            data_from_atoms, parameters_a, parameters_b = prepared
+            atoms_count = parameters_b.shape[0]
+            interaction = get_cutoff_matrix(kappa, molecule.coordinates, self.cutoff, self.damping)
+            if self.damping:  # posun všech dvojic o -kappa / cutoff mimo diagonálu převezme řádek celkového náboje
+                parameters_b = parameters_b - kappa / self.cutoff
+            matrix = get_constrained_matrix(interaction, parameters_b)
+            vector = np.append(parameters_a[:atoms_count], 0.0)
+            yield (molecule.name, molecule.count_atoms, data_from_atoms), matrix, vector
+
+
+def get_cutoff_matrix(kappa, coordinates, cutoff, damping=True):
+    """
+    kappa / r pro dvojice atomů vzdálené nejvýše cutoff jako řídká symetrická matice (N, N) s nulovou diagonálou,
+    dvojice najde KD-strom (scipy.spatial.cKDTree), vzdálenosti se počítají stejně jako v get_distances
+    s damping se od kappa / r odečte kappa / cutoff (posunutý potenciál), hodnota je u cutoff nulová
+    """
+    from scipy.spatial import cKDTree  # knihovna SciPy se načítá jen pro výpočet s cutoff
+    solver.load_sparse()
+    count = coordinates.shape[0]
+    pairs = cKDTree(coordinates).query_pairs(cutoff, output_type="ndarray")
+    first, second = pairs[:, 0], pairs[:, 1]
+    difference = coordinates[first] - coordinates[second]
+    squared = np.float_power(difference[:, 0], 2)
+    squared += np.float_power(difference[:, 1], 2)
+    squared += np.float_power(difference[:, 2], 2)
+    distances = np.sqrt(squared, out=squared)
+    with np.errstate(divide="ignore"):
+        values = np.divide(kappa, distances)
+    if damping:
+        values -= kappa / cutoff
+    return solver.sparse.csr_matrix((np.concatenate((values, values)), (np.concatenate((first, second)),
+                                                                         np.concatenate((second, first)))),
+                                    shape=(count, count))
+
+
+def get_constrained_matrix(interaction, parameters_b):
+    """
+    symetrická soustava EEM (N + 1, N + 1): interakce atomů, parametry B na diagonále a -1 v posledním řádku
+    a sloupci (stejné řešení jako matice s řádkem 1 v Calculate)
+    """
+    count = parameters_b.shape[0]
+    border = solver.sparse.csr_matrix(-np.ones((count, 1)))
+    return solver.sparse.bmat([[interaction + solver.sparse.diags(parameters_b), border], [border.T, None]],
+                              format="csr")
+
+
+"""VÝPOČET PRO VÍCE SOUBORŮ PARAMETRŮ"""
+
+
+SWEEP_ELEMENTS = 1 << 24  # nejvyšší počet prvků matic jedné molekuly, které se řeší najednou (128 MB)
+
+
+class Sweep(Calculate):
+    """
+    náboje pro více souborů parametrů při jednom průchodu sadou molekul
+    vzdálenosti atomů se pro molekulu spočítají jen jednou a kappa / r jen jednou pro každou různou kappa,
+    soustavy všech souborů parametrů se pak řeší najednou, náboje jsou stejné jako při výpočtu s každým souborem zvlášť
+    parameters_sets jsou načtené soubory parametrů, outputs názvy souborů pro náboje (pro každý soubor parametrů jeden)
+    """
+    def __init__(self, molecules, parameters_sets, outputs=None, binary=False, linear_solver="lu"):
+        self.molecules, self.files, self.linear_solver = molecules, [], linear_solver
+        self.sets = [(kappa, yes_type, get_atom_parameters(parameters))
+                     for kappa, yes_type, parameters in parameters_sets]
+        self.output, self.calculated_molecules = [[] for _ in self.sets], [0] * len(self.sets)
+        if outputs:
+            self.files = [chargefile.open_output(output, binary) for output in outputs]
+        try:
+            for molecule in self.molecules:
+                self.calculate_molecule(molecule)
+            for index, calculated_molecules in enumerate(self.calculated_molecules, 1):
+                print("Program calculated {} molecules with {}. parameters.".format(calculated_molecules, index))
+        except KeyError:
+            print("Something wrong with calculate")
+        for f in self.files:
+            f.close()
+            print("Now you can find charge for each element in file {}".format(f.name))
+
+    def calculate_molecule(self, molecule):
+        """soustavy molekuly pro všechny soubory parametrů, řeší se po skupinách o nejvýše SWEEP_ELEMENTS prvcích"""
+        name, count, atoms_count = molecule.name, molecule.count_atoms, molecule.numbers.shape[0]
+        data_from_atoms = list(zip(molecule.element_symbols, molecule.numbers.tolist(), molecule.bonds.tolist()))
+        distances, off_diagonal, systems = get_distances(molecule.coordinates), {}, []
+        for index, (kappa, yes_type, atom_parameter) in enumerate(self.sets):
+            parameters_a, parameters_b = np.zeros((count + 1)), np.zeros((atoms_count))
+            try:
+                for i, (element, number, bond) in enumerate(data_from_atoms):
+                    bond = bond if yes_type else 1  # vazba se v molekule nemění, používají ji další soubory
+                    parameters_a[i] = - atom_parameter[element, "A", bond]
+                    parameters_b[i] = atom_parameter[element, "B", bond]
+                self.calculated_molecules[index] += 1
+            except KeyError:
+                print("Missing parameters for {}. element {}({}) in {}. Program did not count with this "
+                      "element.".format(number, element, bond, name))
+                self.store_set(index, (name, "error", element, 0, atom_parameter))
+                continue
+            if kappa not in off_diagonal:
+                with np.errstate(divide="ignore"):
+                    off_diagonal[kappa] = np.divide(kappa, distances)
+            distance = np.zeros((count + 1, count + 1))
+            distance[:atoms_count, :atoms_count] = off_diagonal[kappa]
+            distance[np.arange(atoms_count), np.arange(atoms_count)] = parameters_b
+            distance[count, :] = 1  # přidání řádku s 1
+            distance[:, count] = -1  # přidání sloupce s -1
+            distance[count, count] = 0
+            systems.append((index, distance, parameters_a))
+        group = max(1, SWEEP_ELEMENTS // (count + 1) ** 2)
+        for start in range(0, len(systems), group):
+            for index, charges in solver.solve_chunk(systems[start:start + group], self.linear_solver):
+                if charges is None:
+                    print("Can not calculate for ", name)
+                    continue
+                self.store_set(index, (name, count, data_from_atoms, charges, self.sets[index][2]))
+
+    def store_set(self, index, result):
+        """uložení výsledku molekuly pro jeden soubor parametrů"""
+        if self.files:
+            self.write_molecule(self.files[index], result)
+        else:
+            self.output[index].append(result)
+
+
+"""PARAMETRY ATOMŮ"""
+
+
+def get_atom_parameters(parameters):
+    """slovník (prvek, "A" nebo "B", vazba) -> hodnota parametru ze souboru parametrů"""
+    atom_parameter = {}
+    for element, type_bond, parameter in parameters:
+        a_parameter, b_parameter = parameter[0]
+        atom_parameter[element, "A", type_bond] = a_parameter
+        atom_parameter[element, "B", type_bond] = b_parameter
+    return atom_parameter
+
+
 """VÝPOČET VZDÁLENOSTI"""
 
 
@@ -74,3 +356,25 @@ def get_distance(kappa, first_coordinate, second_coordinate):
     x1, y1, z1 = first_coordinate
     x2, y2, z2 = second_coordinate
     return kappa / (math.sqrt(((x1 - x2) ** 2) + ((y1 - y2) ** 2) + ((z1 - z2) ** 2)))
+
+
+"""VÝPOČET MATICE VZDÁLENOSTÍ"""
+
+
+def get_distance_matrix(kappa, coordinates, out=None):
+    """
+    Vypočítá kappa / r pro všechny dvojice atomů najednou z matice souřadnic (N, 3).
+    Mocnina se počítá přes np.float_power, aby výsledek byl bit po bitu stejný jako u get_distance
+    (Python ** volá pow() z knihovny C, zatímco np.square násobí). Diagonála (r = 0) je nekonečno a přepíše se.
+    """
+    with np.errstate(divide="ignore"):
+        return np.divide(kappa, get_distances(coordinates), out=out)
+
+
+def get_distances(coordinates):
+    """vzdálenosti r všech dvojic atomů z matice souřadnic (N, 3)"""
+    x, y, z = coordinates[:, 0], coordinates[:, 1], coordinates[:, 2]
+    squared = np.float_power(x[:, np.newaxis] - x, 2)
+    squared += np.float_power(y[:, np.newaxis] - y, 2)
+    squared += np.float_power(z[:, np.newaxis] - z, 2)
+    return np.sqrt(squared, out=squared)
@@ -1,10 +1,12 @@
 import argparse  # pro spouštění částí programu
-import eem  # eem.py
-import graph  # graph.py
-import statistic  # statistic.py
-import classes  # classes.py
-import mgcm  # mgcm.py
-import ogcm  # ogcm.py
+import os  # pro cesty k souborům s náboji
+import sys  # pro ukončení práce při chybějící knihovně
+
+
+"""
+Moduly částí programu se načítají až v části, která je potřebuje, krátké výpočty tak nečekají na načtení
+knihoven, které nepoužijí (Matplotlib se načte jen při vykreslení grafu, SciPy jen s --sparse)
+"""
 
 
 def main():
@@ -14,6 +16,16 @@ def main():
     parser_graph = subparsers.add_parser('graph')
     parser_graph.add_argument("draw_graph", type=str, nargs=2, default=0,
                               help="Give two charges results file, if you have not it, you can used CALCULATION")
+    parser_graph.add_argument('--save', type=str, help="Give a name file (.png, .pdf, ...), if you want save graph "
+                                                       "to file without display")
+    parser_graph.add_argument('--max-points', type=int,
+                              help="Give a maximum number of drawn points, from more charges only part is drawn "
+                                   "(default 100000)")
+    parser_graph.add_argument('--hexbin', action="store_true",
+                              help="Give this argument, if you want draw density of charges instead of points")
+    parser_graph.add_argument('--statistics', action="store_true",
+                              help="Give this argument, if you want only statistics without graph, files with the "
+                                   "same order of molecules are read twice without loading them to memory")
     parser_calculate = subparsers.add_parser('calculation')
     parser_calculate.add_argument('calculate', type=str, nargs="?", default=0,
                                   help="Give one file with molecules (.sdf) for mgcm and "
@@ -24,9 +36,47 @@ def main():
                                   help="Give this argument, if you want calculate with MGC")
     parser_calculate.add_argument('--ogc', action="store_true",
                                   help="Give this argument, if you want calculate with OGC")
-    parser_calculate.add_argument('--parameters', type=str, help="Give this argument for parameters,"
-                                                                 " if you want calculate with EEM")
+    parser_calculate.add_argument('--parameters', type=str, nargs="+",
+                                  help="Give this argument for parameters, if you want calculate with EEM, with more "
+                                       "files charges are calculated for each of them (OUTPUT_1, OUTPUT_2, ...)")
     parser_calculate.add_argument('--output', type=str, help="Give a name file, for output calculate")
+    parser_calculate.add_argument('--output-dir', type=str,
+                                  help="Give a directory for output file with --output, if you do not want it in "
+                                       "directory result")
+    parser_calculate.add_argument('--batch', action="store_true",
+                                  help="Give this argument, if you want solve molecules of the same size together")
+    parser_calculate.add_argument('--jobs', type=int, default=1,
+                                  help="Give a number of processes, if you want calculate in parallel")
+    parser_calculate.add_argument('--sparse', action="store_true",
+                                  help="Give this argument, if you want use sparse matrices for MGC and OGC (SciPy)")
+    parser_calculate.add_argument('--binary', action="store_true",
+                                  help="Give this argument, if you want save charges to binary files in directory "
+                                       "OUTPUT instead of text file")
+    parser_calculate.add_argument('--cache', action="store_true",
+                                  help="Give this argument, if you want save prepared molecules to directory cache "
+                                       "and load them from there in next calculation with the same file")
+    parser_calculate.add_argument('--cutoff', type=float,
+                                  help="Give a distance (Angstrom), if you want calculate EEM for very large molecules "
+                                       "only with pairs of atoms closer than CUTOFF (SciPy), interactions are "
+                                       "shifted to zero at CUTOFF and farther pairs are counted as at CUTOFF, "
+                                       "charges differ from dense EEM by tenths of e at 10 Angstrom and are the same "
+                                       "as dense EEM when CUTOFF exceeds size of molecule (benchmark.py eem-cutoff)")
+    parser_calculate.add_argument('--no-damping', action="store_false", dest="damping",
+                                  help="Give this argument with --cutoff, if you want cut interactions of atoms "
+                                       "abruptly at CUTOFF, charges can then differ from dense EEM by tens of e")
+    parser_calculate.add_argument('--conformers', action="store_true",
+                                  help="Give this argument, if you want calculate EEM for file with conformers, "
+                                       "each conformer is calculated from charges of previous conformer of the same "
+                                       "molecule (SciPy)")
+    parser_calculate.add_argument('--dedup', action="store_true",
+                                  help="Give this argument, if you want calculate MGC and OGC only once for molecules "
+                                       "with the same structure (charges are saved in directory cache)")
+    parser_calculate.add_argument('--solver', choices=["lu", "cholesky"], default="lu",
+                                  help="Give a solver of systems for MGC and OGC, cholesky uses symmetric positive "
+                                       "definite matrix (SciPy)")
+    parser_calculate.add_argument('--eem-solver', choices=["lu", "schur"], default="lu",
+                                  help="Give a solver of systems for EEM, schur eliminates total charge row and "
+                                       "column with Schur complement (SciPy)")
     parser_structure = subparsers.add_parser('structure')
     parser_structure.add_argument('--parameters', type=str, help="Give a file with parameters (EEM) (.xml)")
     parser_structure.add_argument('--molecules', type=str, help="Give a file with molecules (.sdf)")
@@ -35,37 +85,126 @@ def main():
     args = parser.parse_args()
     try:
         if args.calculate:  # počítaní
+            import classes  # classes.py
+            import solver  # solver.py
             mset = classes.MoleculesSet()
-            """eem.py"""
+            set_file, methods = args.calculate, [args.eem, args.mgc, args.ogc].count(True)
+            if args.sparse and not solver.load_sparse():
+                print("For --sparse you need SciPy library.")
+                sys.exit(1)
+            if args.cache and args.jobs > 1:
+                print("You can not use --cache with --jobs.")
+                sys.exit(1)
+            if (args.solver != "lu" or args.eem_solver != "lu") and not solver.load_lapack():
+                print("For --solver cholesky and --eem-solver schur you need SciPy library.")
+                sys.exit(1)
+            if args.eem_solver != "lu" and (args.cutoff or args.conformers):
+                print("You can not use --eem-solver with --cutoff or --conformers.")
+                sys.exit(1)
+            if args.dedup and (args.cache or args.jobs > 1):
+                print("You can not use --dedup with --cache or --jobs.")
+                sys.exit(1)
+            if (args.cutoff or args.conformers) and not (solver.load_sparse() and solver.load_lapack()):
+                print("For --cutoff and --conformers you need SciPy library.")
+                sys.exit(1)
+            if (args.cutoff or args.conformers) and args.jobs > 1:
+                print("You can not use --cutoff or --conformers with --jobs.")
+                sys.exit(1)
+            if args.output_dir and not args.output:
+                print("You can not use --output-dir without --output.")
+                sys.exit(1)
+            if args.output and args.output_dir:  # soubor s náboji mimo adresář result (např. rychlý disk)
+                args.output = os.path.abspath(os.path.join(args.output_dir, args.output))
+            parameters_sets = []
             if args.eem:
-                set_file, para_file = args.calculate, args.parameters
-                mset.load_parameters(para_file)  # načtení parametrů
-                mset.load_from_sdf(set_file, args.eem, args.mgc, args.ogc)  # načtení molekuly
-                cal = eem.Calculate(mset.molecules, mset.parameters)  # výpočet pomocí EEM
-                """
-                Parametry --eem, --mgc,  --ogc jsou boolean parametry
-                """
+                for file_parameters in args.parameters or [None]:
+                    mset.load_parameters(file_parameters)  # načtení parametrů
+                    parameters_sets.append(mset.parameters)
+                if len(parameters_sets) > 1 and (args.jobs > 1 or args.cutoff or args.conformers):
+                    print("You can not use more files with parameters with --jobs, --cutoff or --conformers.")
+                    sys.exit(1)
+            """
+            Parametry --eem, --mgc,  --ogc jsou boolean parametry
+            Při jedné metodě se molekuly načítají postupně a náboje se průběžně zapisují do souboru (--output),
+            při více metodách se molekuly načtou najednou, aby je mohly použít všechny metody
+            a do souboru se uloží výsledek poslední metody
+            s --cache čte každá metoda své připravené molekuly z cache (při prvním výpočtu je ze souboru uloží)
+            s --dedup se MGC a OGC pro molekuly se stejnou strukturou počítá jen jednou (náboje se uloží do cache)
+            """
+            if args.jobs > 1:  # paralelní výpočet, každá metoda zpracuje soubor po částech ve více procesech
+                import parallel  # parallel.py
+                flags = (args.eem, args.mgc, args.ogc, True, args.sparse)
+                for method in [method for method, selected in zip(("eem", "mgc", "ogc"), flags) if selected]:
+                    methods -= 1
+                    parallel.calculate(method, set_file, flags, mset.parameters if args.eem else None, args.batch,
+                                       None if methods else args.output, args.jobs, args.binary,
+                                       args.eem_solver if method == "eem" else args.solver)
+                return
+            topologies = {}  # s --dedup cache nábojů MGC a OGC podle struktury molekuly pro každou metodu
+            if args.dedup:
+                import cache  # cache.py
+                topologies = {method: cache.TopologyCache(method)
+                              for method, selected in (("mgc", args.mgc), ("ogc", args.ogc)) if selected}
+            forms = next(iter(topologies.values()), None)  # kanonický tvar molekul stačí spočítat jednou
+            if args.cache:
+                import cache  # cache.py
+                molecules = None  # molekuly pro jednotlivé metody se připraví až před výpočtem
+            elif methods > 1:
+                mset.load_from_sdf(set_file, args.eem, args.mgc, args.ogc, True, args.sparse,
+                                   forms)  # načtení všech molekul
+                molecules = mset.molecules
             else:
-                set_file = args.calculate
-                mset.load_from_sdf(set_file, args.eem, args.mgc, args.ogc)  # načtení molekuly
+                molecules = mset.iter_sdf(set_file, args.eem, args.mgc, args.ogc, True, args.sparse,
+                                          forms)  # po molekulách
+            """eem.py"""
+            if args.eem:
+                import eem  # eem.py
+                methods -= 1
+                if args.cache:
+                    molecules = cache.iter_cached(mset, set_file, "eem", True, args.sparse)
+                if len(parameters_sets) > 1:  # vzdálenosti atomů se spočítají jednou pro všechny soubory parametrů
+                    outputs = None
+                    if args.output and not methods:
+                        outputs = ["{1}_{0}{2}".format(index, *os.path.splitext(args.output))
+                                   for index in range(1, len(parameters_sets) + 1)]
+                    cal = eem.Sweep(molecules, parameters_sets, outputs, args.binary, args.eem_solver)
+                elif args.cutoff:  # řídká matice a iterativní řešení pro velké molekuly
+                    cal = eem.Cutoff(molecules, mset.parameters, args.cutoff, args.damping,
+                                     None if methods else args.output, args.binary)
+                elif args.conformers:  # konformery se zpřesňují z nábojů předchozího konformeru
+                    cal = eem.Conformers(molecules, mset.parameters, None if methods else args.output, args.binary)
+                else:
+                    cal = eem.Calculate(molecules, mset.parameters, args.batch, None if methods else args.output,
+                                        args.binary, args.eem_solver)  # výpočet pomocí EEM
             """mgcm.py"""
             if args.mgc:
-                cal = mgcm.Calculate(mset.molecules, mset.periodic_table)  # výpočet pomocí MGC
+                import mgcm  # mgcm.py
+                methods -= 1
+                if args.cache:
+                    molecules = cache.iter_cached(mset, set_file, "mgc", True, args.sparse)
+                cal = mgcm.Calculate(molecules, mset.periodic_table, args.batch, None if methods else args.output,
+                                     args.binary, topologies.get("mgc"), args.solver)  # výpočet pomocí MGC
             """ogcm.py"""
             if args.ogc:
-                cal = ogcm.Calculate(mset.molecules)  # výpočet pomocí OGC
-            if args.output:  # pro zadání uložení do souboru --output
-                charge = cal
-                charge.save_charges(args.output)
+                import ogcm  # ogcm.py
+                if args.cache:
+                    molecules = cache.iter_cached(mset, set_file, "ogc", True, args.sparse)
+                cal = ogcm.Calculate(molecules, args.batch, args.output, args.binary, topologies.get("ogc"),
+                                     args.solver)  # výpočet pomocí OGC
+            for topologies_method in topologies.values():
+                topologies_method.save()
     except AttributeError:
         pass
     try:
         """statistic.py """
+        if args.molecules or args.parameters:
+            import classes  # classes.py
+            import statistic  # statistic.py
         if args.molecules:  # vypsání struktury molekul
             stat = statistic.Statistic()
             mset = classes.MoleculesSet()
-            mset.load_from_sdf(args.molecules, True, False, False, args.nobond)  # True aby se chovalo jako při --eem
-            stat.get_statistic_from_set(args.molecules, mset.molecules, args.nobond)  # vypsání struktury
+            molecules = mset.iter_sdf(args.molecules, True, False, False, args.nobond)  # True jako při --eem
+            stat.get_statistic_from_set(args.molecules, molecules, args.nobond)  # vypsání struktury
         if args.parameters:  # vypsání struktury parametrů
             mset = classes.MoleculesSet()
             mset.load_parameters(args.parameters)  # načtení parametrů
@@ -75,8 +214,13 @@ def main():
         pass
     try:
         """graph.py"""
-        if args.draw_graph:  # vytvoření grafu a statistických výpočtů
-            graph.Graph(args.draw_graph)
+        if args.draw_graph and args.statistics:  # jen statistika bez grafu, soubory se čtou postupně dvakrát
+            import comparison  # comparison.py
+            comparison.print_statistics(*comparison.two_pass_compare(*args.draw_graph))
+        elif args.draw_graph:  # vytvoření grafu a statistických výpočtů
+            import graph  # graph.py (načte Matplotlib)
+            max_points = graph.MAX_POINTS if args.max_points is None else args.max_points
+            graph.Graph(args.draw_graph, args.save, max_points, args.hexbin)
     except AttributeError:
         pass
 
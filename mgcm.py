@@ -1,56 +1,103 @@
 import numpy as np  # knihovna NumPy
 import sys  # pro ukončení práce při chybném souboru
+import solver  # solver.py
+import chargefile  # chargefile.py
 
 
 class Calculate:
-    def __init__(self, molecules, periodic_table):
-        self.molecules, self.output, atom_parameter, not_errors_molecules = molecules, [], {}, 0
+    def __init__(self, molecules, periodic_table, batch=False, output=None, binary=False, topologies=None,
+                 linear_solver="lu"):
+        """
+        s topologies (cache.TopologyCache) se náboje molekul se stejnou strukturou počítají jen jednou
+        linear_solver je řešič soustav (solver.LINEAR_SOLVERS), "cholesky" využívá pozitivní definitnost S
+        """
+        self.molecules, self.output, self.calculated_molecules, self.file = molecules, [], 0, None
+        self.topologies = topologies
+        if output:  # náboje se zapisují do souboru hned po spočítání molekuly (textového nebo binárního)
+            self.file = chargefile.open_output(output, binary)
+        """výpočet X = S^{-1} * X^{0}, v dávkovém režimu se soustavy stejné velikosti řeší najednou"""
+        systems = self.prepare_systems(periodic_table)
+        for data, nk_electronegativity in solver.solve_in_batches(systems, solver.BATCH_SIZE if batch else 1,
+                                                                  linear_solver):
+            name, count, data_from_atoms, pt_electronegativity, topology = data
+            if pt_electronegativity is None:  # náboje z cache
+                self.store((name, count, data_from_atoms, nk_electronegativity))
+                continue
+            if nk_electronegativity is None:
+                print("Can not calculate with ", name)
+                continue
+            """výpočet X - X^{0}"""
+            deviation_away_pt = nk_electronegativity-pt_electronegativity
+            """výpočet geometrického průměru přes logaritmy (součin elektronegativit velké molekuly přeteče)"""
+            with np.errstate(divide="ignore"):  # atom bez elektronegativity má průměr 0 jako součin
+                geometric_mean = np.exp(np.log(pt_electronegativity).sum() / count)
+            """výpočet náboje"""
+            charges = deviation_away_pt * (1/geometric_mean)
+            if topology is not None:
+                self.topologies.put(topology, charges)
+            self.store((name, count, data_from_atoms, charges))
+        print("Program calculated {} molecules.".format(self.calculated_molecules))
+        if self.file:
+            self.file.close()
+            print("Now you can find charge for each element in file {}".format(self.file.name))
+
+    def prepare_systems(self, periodic_table):
         for molecule in self.molecules:
+            topology = charges = None
+            if self.topologies is not None:
+                topology, charges = self.topologies.find(molecule)
+            if charges is not None:  # molekula se stejnou strukturou už byla spočítaná, matice se nepřipravují
+                self.calculated_molecules += 1
+                data_from_atoms = list(zip(molecule.element_symbols, molecule.bonds.tolist()))
+                yield (molecule.name, molecule.count_atoms, data_from_atoms, None, None), None, charges
+                continue
             try:
                 """příprava matic"""
                 data_from_atoms, name, data_bond = [], molecule.name, []
                 count = molecule.count_atoms
                 degree_matrix = molecule.count_bond_matrix
                 connectivity_matrix = molecule.bond_matrix
-                identity_matrix = np.eye(count)
+                identity_matrix = solver.identity(count, degree_matrix)
                 """výpočet S = D - A + I"""
                 simplified_matrix = degree_matrix - connectivity_matrix + identity_matrix
                 pt_electronegativity = np.zeros((count, 1))
                 try:
                     """příprava vektoru s hodnotami elektronegativity z periodické tabulky """
-                    for i, atom in enumerate(molecule.atoms):
-                        pt_electronegativity[i][0] = periodic_table[atom.element_symbol]
-                        data_from_atoms.append((atom.element_symbol, atom.bond))
+                    for i, (element, bond) in enumerate(zip(molecule.element_symbols, molecule.bonds.tolist())):
+                        pt_electronegativity[i][0] = periodic_table[element]
+                        data_from_atoms.append((element, bond))
                 except IndexError:
                     print("Can not calculate with ", name)
                     continue
-                not_errors_molecules += 1  # součet spočítaných molekul
-                """výpočet X = S^{-1} * X^{0}"""
-                nk_electronegativity = np.linalg.solve(simplified_matrix, pt_electronegativity)
-                """výpočet X - X^{0}"""
-                deviation_away_pt = nk_electronegativity-pt_electronegativity
-                multiple = 1
-                """výpočet geometrického průměru"""
-                for electroneg in pt_electronegativity:
-                    multiple = multiple * electroneg
-                geometric_mean = multiple**(1/count)
-                """výpočet náboje"""
-                charges = deviation_away_pt * (1/geometric_mean)
-                self.output.append((name, count, data_from_atoms, charges))
+                self.calculated_molecules += 1  # součet spočítaných molekul
+                yield (name, count, data_from_atoms, pt_electronegativity, topology), simplified_matrix, \
+                    pt_electronegativity
             except KeyError:
                 print("Something wrong with calculate")
                 sys.exit()
-        print("Program calculated {} molecules.".format(not_errors_molecules))
 
-    def save_charges(self, file):
-        data = self.output
-        new_file = "result/" + file
-        with open(new_file, "w") as f:
-            for name, count, atoms, charges in data:
-                print("{}\n{}".format(name, int(count)), file=f)
-                for i, (atom, bond) in enumerate(atoms):
-                    print("{0:6d}  {1:>2}{2} {3: f}".format(i + 1, atom, bond, float(charges[i])), file=f)
-        print("Now you can find charge for each element in file {}".format(new_file))
+    def store(self, result):
+        """uložení výsledku molekuly do output, nebo rovnou do souboru při průběžném zápisu"""
+        if self.file:
+            self.write_molecule(self.file, result)
+        else:
+            self.output.append(result)
+
+    def save_charges(self, file, binary=False):  # uložení do souboru (název v result, cesta nebo proud)
+        f = chargefile.open_output(file, binary)
+        for result in self.output:
+            self.write_molecule(f, result)
+        f.close()
+        print("Now you can find charge for each element in file {}".format(f.name))
+
+    def write_molecule(self, f, result):
+        name, count, atoms, charges = result
+        if isinstance(f, chargefile.BinaryWriter):
+            f.write_molecule(name, [(i, atom, bond) for i, (atom, bond) in enumerate(atoms, 1)], charges)
+            return
+        charges = np.asarray(charges, dtype=float).ravel().tolist()  # náboje jako čísla float jedním převodem
+        f.write(chargefile.format_molecule(name, count, [(i + 1, atom, bond, charges[i])
+                                                         for i, (atom, bond) in enumerate(atoms)]))
 
     def give_result(self):
         return self.output
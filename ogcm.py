@@ -1,81 +1,131 @@
 import numpy as np  # knihovna NumPy
 import warnings  # pro vynechání molekuly při výskytu atomu s více než 4 vazebnými partnery
 import sys  # pro ukončení práce při chybném souboru
+import solver  # solver.py
+import chargefile  # chargefile.py
 
 from collections import Counter  # knihovna pro použití funkce Counter()
 
 
 class Calculate:
-    def __init__(self, molecules):
-        self.molecules, self.output, atom_parameter, not_error_molecules = molecules, [], {}, 0
+    def __init__(self, molecules, batch=False, output=None, binary=False, topologies=None, linear_solver="lu"):
+        """
+        s topologies (cache.TopologyCache) se náboje molekul se stejnou strukturou počítají jen jednou
+        linear_solver je řešič soustav (solver.LINEAR_SOLVERS), "cholesky" využívá pozitivní definitnost S
+        """
+        self.molecules, self.output, self.calculated_molecules, self.file = molecules, [], 0, None
+        self.topologies = topologies
+        if output:  # náboje se zapisují do souboru hned po spočítání molekuly (textového nebo binárního)
+            self.file = chargefile.open_output(output, binary)
         try:
-            for molecule in self.molecules:
-                with warnings.catch_warnings():  # když je nějaký nedostatek při výpočtu
-                    warnings.filterwarnings('error')
-                    """příprava matic"""
-                    tb_electronegativity, tb_hardness = molecule.tb_el, molecule.tb_hard
-                    covalent_radii = molecule.tb_coval_radii
-                    data_from_atoms, name, data_bond = [], molecule.name, []
-                    count = molecule.count_atoms
-                    degree_matrix = molecule.count_bond_matrix
-                    connectivity_matrix = molecule.bond_matrix
-                    identity_matrix = np.eye(degree_matrix.shape[0])
-                    charges_electrons = np.zeros((degree_matrix.shape[0], 1))
-                    try:
-                        """výpočet S = D - A + I"""
-                        simplified_matrix = degree_matrix - connectivity_matrix + identity_matrix
-                        nk_electronegativity = np.linalg.solve(simplified_matrix, tb_electronegativity)
-                        deviation_away_pt = nk_electronegativity-tb_electronegativity
-                        denominator = 0.0
-                        numerator = 0.0
-                        """výpočet normalizačního faktoru Dm"""
-                        for i in range(deviation_away_pt.shape[0]):
-                            denominator += deviation_away_pt[i]/tb_hardness[i]
-                            numerator += (deviation_away_pt[i]**2)/((tb_hardness[i]**3) * covalent_radii[i])
-                        dm = denominator/numerator
-                    except Warning:
+            """výpočet X = S^{-1} * X^{0}, v dávkovém režimu se soustavy stejné velikosti řeší najednou"""
+            systems = self.prepare_systems()
+            for (molecule, topology, cached), nk_electronegativity in solver.solve_in_batches(
+                    systems, solver.BATCH_SIZE if batch else 1, linear_solver):
+                name = molecule.name
+                if not cached:  # u molekuly z cache jsou místo elektronegativit orbitalů rovnou náboje atomů
+                    if nk_electronegativity is None:
                         print("Can not calculate for ", name)
                         continue
-                    except Exception:
-                        print("Can not calculate for ", name)
-                        continue
-                shift = 0
-                charge_elements = Counter()
-                try:
-                    """Výpočet náboje jednotlivých orbitalů a výpočet náboje jednotlivých atomů"""
-                    for element, number in molecule.elements_count:
-                        for index in range(molecule.elements_count[element, number]):
-                            """výpočet náboje orbitalu"""
-                            charges_electrons[index + shift][0] = (deviation_away_pt[index + shift][0]/tb_hardness[
-                                index + shift][0])-(((deviation_away_pt[index + shift][0]**2)*dm
-                                                     )/((tb_hardness[index + shift][0]**3)*covalent_radii[index + shift]
-                                                        ))
-                            """výpočet náboje atomů"""
-                            charge_elements[element, number] += float((deviation_away_pt[index + shift]/tb_hardness[
-                                index + shift])-(((deviation_away_pt[index + shift]**2)*dm
-                                                  )/((tb_hardness[index + shift]**3)*covalent_radii[index + shift])))
-                        shift += molecule.elements_count[element, number]
-                except IndexError:
-                    print("Can not finished calculation for ", name)
-                    continue
-                not_error_molecules += 1  # součet spočítaných molekul
-                for atom in molecule.atoms:  # načtení symbolu prvku a maximální vazby pro případné uložení do souboru
-                    data_from_atoms.append((atom.element_symbol, atom.bond))
-                self.output.append((name, count, data_from_atoms, charge_elements))
+                    with warnings.catch_warnings():  # když je nějaký nedostatek při výpočtu
+                        warnings.filterwarnings('error')
+                        try:
+                            atom_charges = get_atom_charges(nk_electronegativity - molecule.tb_el, molecule.tb_hard,
+                                                            molecule.tb_coval_radii, molecule.valences)
+                        except IndexError:
+                            print("Can not finished calculation for ", name)
+                            continue
+                        except Exception:  # i Warning
+                            print("Can not calculate for ", name)
+                            continue
+                    if topology is not None:
+                        self.topologies.put(topology, atom_charges)
+                else:
+                    atom_charges = nk_electronegativity
+                self.calculated_molecules += 1  # součet spočítaných molekul
+                # symbol prvku a maximální vazba atomů pro uložení do souboru, náboje podle prvku a čísla atomu
+                symbols = molecule.element_symbols
+                self.store((name, molecule.count_atoms, list(zip(symbols, molecule.bonds.tolist())),
+                            Counter(dict(zip(zip(symbols, molecule.numbers.tolist()), atom_charges.tolist())))))
         except KeyError or IndexError:
             print("Something wrong with calculate")
             sys.exit()
-        print("Program calculated {} molecules.".format(not_error_molecules))
+        print("Program calculated {} molecules.".format(self.calculated_molecules))
+        if self.file:
+            self.file.close()
+            print("Now you can find charge for each element in file {}".format(self.file.name))
+
+    def prepare_systems(self):
+        for molecule in self.molecules:
+            topology = charges = None
+            if self.topologies is not None:
+                topology, charges = self.topologies.find(molecule)
+            if charges is not None:  # molekula se stejnou strukturou už byla spočítaná, matice se nepřipravují
+                yield (molecule, None, True), None, charges
+                continue
+            with warnings.catch_warnings():  # když je nějaký nedostatek při výpočtu
+                warnings.filterwarnings('error')
+                """příprava matic"""
+                degree_matrix = molecule.count_bond_matrix
+                connectivity_matrix = molecule.bond_matrix
+                try:
+                    identity_matrix = solver.identity(degree_matrix.shape[0], degree_matrix)
+                    """výpočet S = D - A + I"""
+                    simplified_matrix = degree_matrix - connectivity_matrix + identity_matrix
+                except Exception:
+                    print("Can not calculate for ", molecule.name)
+                    continue
+            yield (molecule, topology, False), simplified_matrix, molecule.tb_el
+
+    def store(self, result):
+        """uložení výsledku molekuly do output, nebo rovnou do souboru při průběžném zápisu"""
+        if self.file:
+            self.write_molecule(self.file, result)
+        else:
+            self.output.append(result)
 
-    def save_charges(self, file):  # uložení do souboru
-        data = self.output
-        new_file = "result/" + file
-        with open(new_file, "w") as f:
-            for name, count, atoms, charges in data:
-                print("{}\n{}".format(name, int(count)), file=f)
-                for index, (atom, bond) in enumerate(atoms, 1):
-                    print("{0:6d}  {1:>2}{2} {3: f}".format(index, atom, bond, float(charges[atom, index])), file=f)
-        print("Now you can find charge for each element in file {}".format(new_file))
+    def save_charges(self, file, binary=False):  # uložení do souboru (název v result, cesta nebo proud)
+        f = chargefile.open_output(file, binary)
+        for result in self.output:
+            self.write_molecule(f, result)
+        f.close()
+        print("Now you can find charge for each element in file {}".format(f.name))
+
+    def write_molecule(self, f, result):
+        name, count, atoms, charges = result
+        if isinstance(f, chargefile.BinaryWriter):
+            f.write_molecule(name, [(index, atom, bond) for index, (atom, bond) in enumerate(atoms, 1)],
+                             [charges[atom, index] for index, (atom, bond) in enumerate(atoms, 1)])
+            return
+        f.write(chargefile.format_molecule(name, count, [(index, atom, bond, float(charges[atom, index]))
+                                                         for index, (atom, bond) in enumerate(atoms, 1)]))
 
     def give_result(self):
         return self.output
+
+
+"""NÁBOJE ATOMŮ Z ELEKTRONEGATIVIT ORBITALŮ"""
+
+
+def get_atom_charges(deviation_away_pt, tb_hardness, covalent_radii, valences):
+    """
+    náboje atomů jako součty nábojů jejich orbitalů, valences jsou počty orbitalů atomů v pořadí řádků vektorů
+    normalizační faktor Dm, náboje orbitalů i součty za atomy se počítají pro celou molekulu najednou, součty
+    se sčítají postupně ve stejném pořadí jako po jednotlivých orbitalech, výsledek je proto stejný
+    """
+    deviation, hardness, radii = deviation_away_pt.ravel(), tb_hardness.ravel(), covalent_radii.ravel()
+    orbital_atoms = np.repeat(np.arange(valences.shape[0]), valences)  # index atomu každého orbitalu
+    count = orbital_atoms.shape[0]
+    if count > deviation.shape[0]:
+        raise IndexError("Atoms have more orbitals than molecule")
+    """výpočet normalizačního faktoru Dm"""
+    dm = sequential_sum(deviation/hardness) / sequential_sum(deviation**2/(hardness**3 * radii))
+    """výpočet náboje orbitalů a součet nábojů orbitalů jednotlivých atomů"""
+    deviation, hardness, radii = deviation[:count], hardness[:count], radii[:count]
+    orbital_charges = deviation/hardness - (deviation**2 * dm)/(hardness**3 * radii)
+    return np.bincount(orbital_atoms, weights=orbital_charges, minlength=valences.shape[0])
+
+
+def sequential_sum(values):
+    """součet prvků postupně zleva (np.sum sčítá po blocích a může se lišit v posledním bitu)"""
+    return np.cumsum(values)[-1] if values.shape[0] else np.float64(0.0)
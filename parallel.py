@@ -0,0 +1,108 @@
+import io  # pro předání části sady molekul jako souboru v paměti
+import contextlib  # pro zachycení výpisů z jednotlivých procesů
+import multiprocessing  # pro výpočet ve více procesech
+import sys  # pro ukončení práce při chybném souboru
+import classes  # classes.py
+import chargefile  # chargefile.py
+import eem  # eem.py
+import mgcm  # mgcm.py
+import ogcm  # ogcm.py
+
+from collections import deque  # fronta rozpracovaných částí sady
+
+
+CHUNK_SIZE = 200  # počet molekul v jedné části sady, kterou dostane jeden proces
+SUMMARY_LINES = ("Load molecules from ", "Program calculated ")  # souhrnné výpisy, které vypíše až hlavní proces
+
+
+"""PARALELNÍ VÝPOČET NÁBOJŮ"""
+
+
+def calculate(method, filename, flags, parameters, batch, output, jobs, binary=False, linear_solver="lu"):
+    """
+    sada molekul se čte postupně po částech o CHUNK_SIZE molekulách, procesy dostávají jen text molekul ze souboru .sdf
+    výsledky se zapisují ve stejném pořadí jako v souboru, rozpracováno je nejvýše 2 * jobs částí
+    """
+    calculated_molecules, pending = 0, deque()
+    f = chargefile.open_output(output, binary) if output else None
+    with multiprocessing.Pool(jobs) as pool:
+        for chunk in read_chunks(filename):
+            pending.append(pool.apply_async(calculate_chunk, (method, chunk, flags, parameters, batch, bool(f),
+                                                              binary, linear_solver)))
+            if len(pending) >= 2 * jobs:
+                calculated_molecules += write_chunk(f, pending.popleft().get())
+        while pending:
+            calculated_molecules += write_chunk(f, pending.popleft().get())
+    print("Load molecules from {}".format(filename))
+    print("Program calculated {} molecules.".format(calculated_molecules))
+    if f:
+        f.close()
+        print("Now you can find charge for each element in file {}".format(f.name))
+
+
+def write_chunk(f, result):
+    """
+    vypíše hlášení z procesu a zapíše náboje části sady do souboru, vrací počet spočítaných molekul
+    text je u binárního souboru seznam molekul z BinaryWriter procesu
+    """
+    text, calculated_molecules, log, exit_error = result
+    for line in log.splitlines():
+        if not line.startswith(SUMMARY_LINES):
+            print(line)
+    if exit_error is not None:  # výpočet v procesu skončil pomocí sys.exit()
+        raise exit_error
+    if isinstance(f, chargefile.BinaryWriter):
+        f.extend(text)
+    elif f:
+        f.write(text)
+    return calculated_molecules
+
+
+"""VÝPOČET JEDNÉ ČÁSTI SADY V PROCESU"""
+
+
+def calculate_chunk(method, chunk, flags, parameters, batch, save, binary=False, linear_solver="lu"):
+    """
+    část sady se načte stejně jako celý soubor a spočítá stejnou třídou Calculate jako při výpočtu v jednom procesu,
+    proto jsou náboje v souboru stejné jako bez --jobs
+    vrací text s náboji, počet spočítaných molekul, výpisy z výpočtu a případné ukončení programu (SystemExit)
+    """
+    text = chargefile.BinaryWriter() if binary else io.StringIO()  # binární náboje zůstanou v text.pending
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            mset = classes.MoleculesSet()
+            molecules = mset.iter_sdf(io.StringIO(chunk), *flags)
+            if method == "eem":
+                cal = eem.Calculate(molecules, parameters, batch, linear_solver=linear_solver)
+            elif method == "mgc":
+                cal = mgcm.Calculate(molecules, mset.periodic_table, batch, linear_solver=linear_solver)
+            else:
+                cal = ogcm.Calculate(molecules, batch, linear_solver=linear_solver)
+        except SystemExit as error:  # sys.exit() by v procesu ukončil jen proces, ne celý program
+            return "", 0, log.getvalue(), error
+        if save:
+            for result in cal.output:
+                cal.write_molecule(text, result)
+    return text.pending if binary else text.getvalue(), cal.calculated_molecules, log.getvalue(), None
+
+
+"""ROZDĚLENÍ SOUBORU .sdf NA ČÁSTI"""
+
+
+def read_chunks(filename):
+    """vrací text po CHUNK_SIZE molekulách, molekula končí řádkem s $$$$ stejně jako při načítání v classes.py"""
+    try:
+        with open(filename, "r") as fh:
+            lines, count = [], 0
+            for line in fh:
+                lines.append(line)
+                if "$$$$" in line:
+                    count += 1
+                    if count == CHUNK_SIZE:
+                        yield "".join(lines)
+                        lines, count = [], 0
+            if lines:
+                yield "".join(lines)
+    except IOError:
+        print("Wrong file for molecules set! Try another file than {}".format(filename))
+        sys.exit(1)
@@ -0,0 +1,252 @@
+import numpy as np  # knihovna NumPy
+import warnings  # pro potlačení varování při singulární řídké matici
+
+from collections import defaultdict  # knihovna pro použití funkce defaultdict()
+
+sparse = sparse_linalg = None  # knihovna SciPy je potřeba jen pro řídké matice (--sparse), načte ji load_sparse
+lapack = None  # funkce LAPACK z knihovny SciPy pro řešiče "cholesky", "schur" a konformery, načte je load_lapack
+
+
+BATCH_SIZE = 1000  # počet molekul, které se najednou řeší v dávkovém režimu
+ITERATIVE_TOLERANCE = 1e-12  # relativní přesnost iterativního řešení řídkých soustav (solve_iterative)
+ITERATIVE_MAX_ITERATIONS = 1000  # nejvyšší počet iterací, téměř singulární soustavy se pak řeší přímo
+REFINE_MAX_ITERATIONS = 20  # nejvyšší počet kroků zpřesnění konformeru (refine), potom se soustava rozloží znovu
+SPARSE_MIN_SIZE = 200  # menší řídké soustavy se řeší hustě, výsledky malých molekul jsou stejné jako bez --sparse
+"""
+řešiče hustých soustav: "lu" obecný rozklad LU (np.linalg.solve), "cholesky" rozklad Cholesky pro symetrické
+pozitivně definitní matice S = D - A + I (MGC, OGC), "schur" pro matici EEM ohraničenou řádkem a sloupcem
+celkového náboje (vazba se odstraní přes Schurův doplněk)
+"""
+LINEAR_SOLVERS = ("lu", "cholesky", "schur")
+SCHUR_MIN_SIZE = 60  # menší soustavy EEM se řeší rozkladem LU i s řešičem "schur" (režie dvou volání LAPACK)
+
+
+"""ŘEŠENÍ SOUSTAV ROVNIC PO DÁVKÁCH"""
+
+
+def solve_in_batches(systems, batch_size=1, linear_solver="lu"):
+    """
+    systems je posloupnost trojic (data, matice, vektor) jednotlivých molekul
+    vrací dvojice (data, řešení) ve stejném pořadí, v jakém soustavy přišly, řešení je None pro singulární matici
+    soustava s maticí None má místo vektoru už známé řešení (např. z cache), to se vrátí beze změny
+    při batch_size = 1 se každá soustava řeší hned po přípravě, jinak se řeší celá dávka najednou
+    linear_solver je jeden z LINEAR_SOLVERS
+    """
+    chunk = []
+    for system in systems:
+        chunk.append(system)
+        if len(chunk) >= batch_size:
+            yield from solve_chunk(chunk, linear_solver)
+            chunk = []
+    yield from solve_chunk(chunk, linear_solver)
+
+
+def solve_chunk(chunk, linear_solver="lu"):
+    """
+    soustavy se rozdělí podle velikosti matice a každá skupina se vyřeší jedním voláním np.linalg.solve,
+    s řešiči "cholesky" a "schur" se každá soustava řeší zvlášť (NumPy nemá dávkové řešení s trojúhelníkovou maticí)
+    """
+    solutions = [None] * len(chunk)
+    if len(chunk) == 1 or linear_solver != "lu":
+        for index, (data, matrix, vector) in enumerate(chunk):
+            solutions[index] = solve_one(matrix, vector, linear_solver)
+    else:
+        buckets = defaultdict(list)
+        for index, (data, matrix, vector) in enumerate(chunk):
+            if matrix is None or is_sparse(matrix):  # řídké matice se neskládají, každá se řeší zvlášť
+                solutions[index] = solve_one(matrix, vector)
+                continue
+            buckets[matrix.shape, vector.shape].append(index)
+        for (matrix_shape, vector_shape), indexes in buckets.items():
+            matrices = np.stack([chunk[index][1] for index in indexes])
+            vectors = np.stack([chunk[index][2].reshape(matrix_shape[0], -1) for index in indexes])
+            try:
+                results = np.linalg.solve(matrices, vectors)
+            except np.linalg.LinAlgError:  # v dávce je singulární matice, dávka se vyřeší po jednotlivých soustavách
+                for index in indexes:
+                    solutions[index] = solve_one(chunk[index][1], chunk[index][2])
+                continue
+            for index, result in zip(indexes, results):  # rozdělení výsledků zpět k molekulám
+                solutions[index] = result.reshape(vector_shape)
+    for (data, matrix, vector), solution in zip(chunk, solutions):
+        yield data, solution
+
+
+def solve_one(matrix, vector, linear_solver="lu"):
+    if matrix is None:  # známé řešení
+        return vector
+    if is_sparse(matrix):
+        if matrix.shape[0] >= SPARSE_MIN_SIZE:
+            return solve_sparse(matrix, vector)
+        matrix = matrix.toarray()
+    if linear_solver == "cholesky":
+        return solve_cholesky(matrix, vector)
+    if linear_solver == "schur" and matrix.shape[0] >= SCHUR_MIN_SIZE:
+        return solve_bordered(matrix, vector)
+    try:
+        return np.linalg.solve(matrix, vector)
+    except np.linalg.LinAlgError:
+        return None
+
+
+"""ŘEŠENÍ SOUSTAV S VYUŽITÍM STRUKTURY MATICE"""
+
+
+def load_lapack():
+    """načte funkce LAPACK z knihovny SciPy až při prvním použití, vrací False, pokud SciPy není nainstalovaná"""
+    global lapack
+    if lapack is None:
+        try:
+            import scipy.linalg.lapack
+        except ImportError:
+            return False
+        lapack = scipy.linalg.lapack
+    return True
+
+
+def solve_cholesky(matrix, vector):
+    """
+    řešení soustavy se symetrickou pozitivně definitní maticí rozkladem Cholesky (LAPACK posv), rozklad stojí
+    polovinu operací rozkladu LU, matice, která není pozitivně definitní, se řeší rozkladem LU
+    """
+    load_lapack()
+    _, solution, info = lapack.dposv(matrix, vector.reshape(matrix.shape[0], -1), lower=1)
+    if info != 0:
+        return solve_one(matrix, vector)
+    return solution.reshape(vector.shape)
+
+
+def solve_bordered(matrix, vector):
+    """
+    řešení soustavy [[K, c], [r, d]] [x, y] = [a, b] s jedním řádkem a sloupcem navíc (EEM s celkovým nábojem)
+    K se rozloží jen jednou pro dvě pravé strany K [u, v] = [a, c] (Cholesky, pro indefinitní K rozklad LDL^T),
+    y = (b - r u) / (d - r v) se Schurovým doplňkem d - r v ve jmenovateli a x = u - y v
+    singulární K (např. atomy bez vazby) se řeší rozkladem LU celé matice
+    """
+    load_lapack()
+    size, right_side = matrix.shape[0] - 1, vector.ravel()
+    sides = np.empty((size, 2))
+    sides[:, 0], sides[:, 1] = right_side[:size], matrix[:size, size]
+    _, solved, info = lapack.dposv(matrix[:size, :size], sides, lower=1)
+    if info != 0:  # K není pozitivně definitní
+        _, _, solved, info = lapack.dsysv(matrix[:size, :size], sides, lower=1)
+    row_u, row_v = matrix[size, :size] @ solved
+    schur = matrix[size, size] - row_v
+    if info != 0 or schur == 0 or not np.isfinite(schur):
+        return solve_one(matrix, vector)
+    solution = np.empty(size + 1)
+    solution[size] = last = (right_side[size] - row_u) / schur
+    solution[:size] = solved[:, 0] - last * solved[:, 1]
+    return solution.reshape(vector.shape)
+
+
+"""OPAKOVANÉ ŘEŠENÍ PODOBNÝCH SOUSTAV (KONFORMERY)"""
+
+
+def factorize(matrix):
+    """rozklad LU (LAPACK getrf) pro řešení dalších podobných soustav (refine), None pro singulární matici"""
+    load_lapack()
+    lu, pivots, info = lapack.dgetrf(matrix)
+    if info != 0:
+        return None
+    return lu, pivots
+
+
+def solve_factorized(factorization, vector):
+    """řešení soustavy s už rozloženou maticí (factorize), stojí jen dvě zpětné substituce"""
+    solution, info = lapack.dgetrs(*factorization, vector.reshape(vector.shape[0], -1))
+    if info != 0 or not np.all(np.isfinite(solution)):
+        return None
+    return solution.reshape(vector.shape)
+
+
+def refine(matrix, vector, factorization, x0):
+    """
+    řešení soustavy z počátečního odhadu x0 (např. nábojů předchozího konformeru) metodou GMRES předpodmíněnou
+    rozkladem podobné soustavy (factorize), krok stojí násobení matice a vektoru a dvě zpětné substituce
+    místo nového rozkladu, vrací None, pokud řešení nedosáhne přesnosti ITERATIVE_TOLERANCE
+    do REFINE_MAX_ITERATIONS kroků
+    """
+    load_sparse()
+    preconditioner = sparse_linalg.LinearOperator(matrix.shape, dtype=float, matvec=lambda residual: lapack.dgetrs(
+        *factorization, residual)[0])
+    options = {"x0": np.ravel(x0), "M": preconditioner, "restart": REFINE_MAX_ITERATIONS, "maxiter": 1, "atol": 0.0}
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore")
+        try:
+            solution, info = sparse_linalg.gmres(matrix, vector.ravel(), rtol=ITERATIVE_TOLERANCE, **options)
+        except TypeError:  # SciPy starší než 1.12 má místo rtol parametr tol
+            solution, info = sparse_linalg.gmres(matrix, vector.ravel(), tol=ITERATIVE_TOLERANCE, **options)
+    if info != 0 or not np.all(np.isfinite(solution)):
+        return None
+    return solution.reshape(vector.shape)
+
+
+"""ŘÍDKÉ MATICE"""
+
+
+def load_sparse():
+    """
+    načte knihovnu SciPy až při prvním použití řídkých matic, výpočty bez --sparse ji nenačítají
+    vrací False, pokud knihovna SciPy není nainstalovaná
+    """
+    global sparse, sparse_linalg
+    if sparse is None:
+        try:
+            import scipy.sparse
+            import scipy.sparse.linalg
+        except ImportError:
+            return False
+        sparse, sparse_linalg = scipy.sparse, scipy.sparse.linalg
+    return True
+
+
+def is_sparse(matrix):
+    return sparse is not None and sparse.issparse(matrix)
+
+
+def new_matrix(size, use_sparse=False):
+    """nulová čtvercová matice, řídká matice se plní po prvcích ve formátu LIL a po naplnění se převede na CSR"""
+    if use_sparse and load_sparse():
+        return sparse.lil_matrix((size, size))
+    return np.zeros((size, size))
+
+
+def identity(size, like):
+    """jednotková matice ve stejném formátu (hustá nebo řídká) jako matice like"""
+    if is_sparse(like):
+        return sparse.identity(size, format="csr")
+    return np.eye(size)
+
+
+def solve_iterative(matrix, vector, preconditioner, x0=None):
+    """
+    řešení velké symetrické (i indefinitní) řídké soustavy metodou MINRES, preconditioner je kladná diagonála
+    přibližné inverze matice, x0 počáteční odhad řešení
+    vrací None, pokud řešení nedosáhne přesnosti ITERATIVE_TOLERANCE do ITERATIVE_MAX_ITERATIONS iterací
+    """
+    load_sparse()
+    options = {"x0": None if x0 is None else x0.ravel(), "M": sparse.diags(preconditioner),
+               "maxiter": ITERATIVE_MAX_ITERATIONS}
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore")
+        try:
+            solution, info = sparse_linalg.minres(matrix, vector.ravel(), rtol=ITERATIVE_TOLERANCE, **options)
+        except TypeError:  # SciPy starší než 1.12 má místo rtol parametr tol
+            solution, info = sparse_linalg.minres(matrix, vector.ravel(), tol=ITERATIVE_TOLERANCE, **options)
+    if info != 0 or not np.all(np.isfinite(solution)):
+        return None
+    return solution.reshape(vector.shape)
+
+
+def solve_sparse(matrix, vector):
+    """přímé řešení řídké soustavy (SuperLU), řešení má stejný tvar jako vektor pravé strany"""
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore")  # singulární matice se pozná podle výsledku
+        try:
+            solution = sparse_linalg.spsolve(sparse.csc_matrix(matrix), vector.ravel())
+        except RuntimeError:
+            return None
+    if not np.all(np.isfinite(solution)):  # singulární matice
+        return None
+    return solution.reshape(vector.shape)
@@ -1,20 +1,31 @@
+import numpy as np  # knihovna NumPy
+import classes  # classes.py
+
 from collections import Counter  # knihovna pro použití funkce Counter()
 
 
 class Statistic:
     def get_statistic_from_set(self, file_set, molecules, type_bond=True):
-        elements, count_element, count_all_atoms, elements_in_molecules = [], Counter(), 0, []
+        count_keys, count_all_atoms, keys_in_molecules = Counter(), 0, Counter()
+        """
+        molekuly se procházejí postupně a ukládají se jen součty, takže stačí i generátor z MoleculesSet.iter_sdf
+        atomy se počítají z polí molekuly, klíč atomu je kód prvku a maximální vazba (type_bond) nebo jen kód prvku
+        """
         for count, molecule in enumerate(molecules, start=1):
-            for atom in molecule.atoms:
-                elements.append(atom.element_symbol)
-            count_element += molecule.elements_count
+            keys = molecule.elements.astype(np.int32)
+            if type_bond:
+                keys = (keys << 8) | molecule.bonds.astype(np.uint8)
+            found, counts = np.unique(keys, return_counts=True)
+            count_keys.update(dict(zip(found.tolist(), counts.tolist())))
             count_all_atoms += molecule.count_atoms
             """
             sčítají se všechny molekuly
             """
-            for key in molecule.elements_count:
-                elements_in_molecules.append(key)  # uložení výskytu atomu v molekulách
-        count_element_in_molecule = Counter(elements_in_molecules)  # spočítání výskytu v molekulách
+            keys_in_molecules.update(found.tolist())  # spočítání výskytu v molekulách
+        count_element, count_element_in_molecule = Counter(), Counter()
+        for key in count_keys:  # převod kódů na symboly prvků (a vazby)
+            element = (classes.ELEMENT_SYMBOLS[key >> 8], key & 0xff) if type_bond else classes.ELEMENT_SYMBOLS[key]
+            count_element[element], count_element_in_molecule[element] = count_keys[key], keys_in_molecules[key]
         print("Number of elements in whole set {}: {} molecules.".format(file_set, count))
 
         """----For print number of elements in whole set not by bond----